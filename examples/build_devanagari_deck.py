@@ -1,4 +1,3 @@
-import sys
 import re
 from pathlib import Path
 from ruamel.yaml import YAML
@@ -6,8 +5,6 @@ from aksharamukha import transliterate
 from bs4 import BeautifulSoup
 import requests
 
-# Add project root to path
-sys.path.append(str(Path(__file__).parent.parent))
 from src.adapters import AnkiConnectAdapter
 
 DEVANAGARI_CHARS = [
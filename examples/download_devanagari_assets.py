@@ -1,69 +1,89 @@
 import requests
 import os
+import shutil
+import threading
 import time
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def get_category_members(category_name):
-    """Lấy danh sách tên file trong Category."""
+# Session dùng chung: giữ kết nối keep-alive + pool đủ lớn cho các worker
+# song song, tránh trả giá TCP/TLS handshake cho từng request nhỏ.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3),
+))
+_SESSION.headers.update({"User-Agent": "AnkiVibeBot/1.0 (https://github.com/hieucao/anki-vibe)"})
+
+
+class _RateLimiter:
+    """
+    Giãn cách tối thiểu giữa các request (thread-safe). Khác với
+    time.sleep(0.5) cố định: chỉ chờ phần còn thiếu của khoảng cách,
+    và các worker vẫn chạy song song phần network I/O.
+    """
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._last_call = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._last_call + self.min_interval - now
+            if delay > 0:
+                time.sleep(delay)
+                now = time.monotonic()
+            self._last_call = now
+
+
+# Wikimedia etiquette: giữ nhịp lịch sự thay vì burst không kiểm soát
+_API_LIMITER = _RateLimiter(min_interval=0.1)
+
+def get_category_file_urls(category_name):
+    """
+    Lấy (title, url) cho toàn bộ file trong Category bằng một query duy nhất:
+    generator=categorymembers + prop=imageinfo trả về URL kèm theo title,
+    nên không cần pass thứ hai resolve URL theo chunk 50 nữa.
+    """
     print(f"📡 Listing {category_name}...")
     url = "https://commons.wikimedia.org/w/api.php"
-    members = []
-    cmcontinue = None
-    
+    file_map = {}  # title -> url
+    gcmcontinue = None
+
     while True:
         params = {
             "action": "query",
-            "list": "categorymembers",
-            "cmtitle": category_name,
-            "cmlimit": "500",
+            "generator": "categorymembers",
+            "gcmtitle": category_name,
+            "gcmlimit": "500",
+            "prop": "imageinfo",
+            "iiprop": "url",
             "format": "json"
         }
-        if cmcontinue:
-            params["cmcontinue"] = cmcontinue
-            
-        headers = {"User-Agent": "AnkiVibeBot/1.0"}
+        if gcmcontinue:
+            params["gcmcontinue"] = gcmcontinue
+
         try:
-            res = requests.get(url, params=params, headers=headers).json()
-            batch = res.get("query", {}).get("categorymembers", [])
-            members.extend([m["title"] for m in batch])
-            
+            _API_LIMITER.wait()
+            res = _SESSION.get(url, params=params).json()
+            pages = res.get("query", {}).get("pages", {})
+            for _, page in pages.items():
+                if "imageinfo" in page:
+                    file_map[page["title"]] = page["imageinfo"][0]["url"]
+
             if "continue" in res:
-                cmcontinue = res["continue"]["cmcontinue"]
+                gcmcontinue = res["continue"]["gcmcontinue"]
             else:
                 break
         except Exception as e:
             print(f"❌ Failed to list category: {e}")
             break
-            
-    return members
 
-def get_file_urls(titles):
-    """Lấy URL cho danh sách titles (max 50)."""
-    url = "https://commons.wikimedia.org/w/api.php"
-    # Join titles with |
-    titles_str = "|".join(titles)
-    params = {
-        "action": "query",
-        "titles": titles_str,
-        "prop": "imageinfo",
-        "iiprop": "url",
-        "format": "json"
-    }
-    headers = {"User-Agent": "AnkiVibeBot/1.0"}
-    
-    file_map = {} # title -> url
-    try:
-        res = requests.get(url, params=params, headers=headers).json()
-        pages = res.get("query", {}).get("pages", {})
-        for _, page in pages.items():
-            if "imageinfo" in page:
-                title = page["title"]
-                url = page["imageinfo"][0]["url"]
-                file_map[title] = url
-    except Exception as e:
-        print(f"❌ Error getting URLs: {e}")
-        
     return file_map
 
 def download_file(args):
@@ -77,12 +97,13 @@ def download_file(args):
         return
 
     try:
-        headers = {"User-Agent": "AnkiVibeBot/1.0 (https://github.com/hieucao/anki-vibe)"}
-        res = requests.get(url, headers=headers, stream=True)
+        _API_LIMITER.wait()
+        res = _SESSION.get(url, stream=True)
         if res.status_code == 200:
+            # Đọc 64KB mỗi lần qua copyfileobj thay vì vòng lặp Python 1KB/chunk
+            res.raw.decode_content = True
             with open(dest_path, 'wb') as f:
-                for chunk in res.iter_content(1024):
-                    f.write(chunk)
+                shutil.copyfileobj(res.raw, f, length=65536)
             print(f"✅ Downloaded: {clean_name}")
         else:
             print(f"❌ Failed {clean_name}: {res.status_code}")
@@ -98,24 +119,11 @@ def main():
         "Category:Devanagari_stroke_order_(SVG)"
     ]
     
-    all_titles = []
-    for cat in categories:
-        all_titles.extend(get_category_members(cat))
-        
-    print(f"Found {len(all_titles)} files total.")
-    
-    # Batch get URLs (50 at a time)
     download_queue = []
-    chunk_size = 50
-    
-    print("📡 Resolving URLs...")
-    for i in range(0, len(all_titles), chunk_size):
-        chunk = all_titles[i:i + chunk_size]
-        url_map = get_file_urls(chunk)
-        for title, url in url_map.items():
+    for cat in categories:
+        for title, url in get_category_file_urls(cat).items():
             download_queue.append((title, url, dest_dir))
-        time.sleep(0.5) # Be nice to API
-            
+
     print(f"Ready to download {len(download_queue)} files.")
     
     # Download Parallel
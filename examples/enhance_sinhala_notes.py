@@ -1,21 +1,68 @@
-import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from ruamel.yaml import YAML
-from aksharamukha import transliterate
 import regex as re
 
-def syllabify_sinhala(text: str) -> list[str]:
+from src.utils.syllabify import syllabify_sinhala
+from src.utils.translit_cache import translit
+
+_IS_SINHALA = re.compile(r'\p{Script=Sinhala}')
+
+# YAML typ="safe" dùng C loader/dumper, nhanh hơn nhiều lần so với
+# round-trip mode; các script này chỉ set field mới nên không cần giữ
+# comment/quote của file gốc.
+_YAML = YAML(typ="safe", pure=False)
+_YAML.default_flow_style = False
+_YAML.allow_unicode = True
+_YAML.width = 4096
+
+
+def _process_note(note):
     """
-    Tách âm tiết Sinhala sử dụng Unicode Range cụ thể.
+    Worker cho ProcessPoolExecutor: tính các field cần set cho một note.
+    Trả về dict field mới hoặc None nếu note không cần xử lý. Không mutate
+    note — merge diễn ra ở main process trước khi dump YAML.
     """
-    # Base chars: Nguyên âm độc lập (0D85-0D96) & Phụ âm (0D9A-0DC6)
-    base = r'[\u0d85-\u0d96\u0d9a-\u0dc6]'
-    # Marks: Dấu nguyên âm, Virama (0DCA-0DF3), ZWJ (\u200d), Anusvara/Visarga (0D82-0D83)
-    # ZWJ: \u200d
-    marks = r'(?:[\u0dca-\u0df3\u0d82-\u0d83]|\u200d)'
-    
-    pattern = f'{base}{marks}*'
-    return re.findall(pattern, text)
+    if "nemo_sinhala" not in note.get("tags", []):
+        return None
+
+    # Idempotent: note đã xử lý bởi phiên bản thuật toán này thì bỏ qua.
+    # Bump suffix (_v2...) khi đổi logic segment/IPA.
+    if note["fields"].get("IPA") and "ipa_v1" in note.get("tags", []):
+        return None
+
+    sinhala_text = note["fields"].get("Sinhala", "")
+    if not sinhala_text:
+        return None
+
+    words = sinhala_text.split()
+    seg_parts = []
+    ipa_parts = []
+
+    for word in words:
+        # Fast path: token thuần ASCII (dấu câu, tiếng Anh xen kẽ) chắc chắn
+        # không chứa Sinhala -> khỏi chạy regex Unicode property
+        if word.isascii() or not _IS_SINHALA.search(word):
+            seg_parts.append(word)
+            ipa_parts.append(word)
+            continue
+
+        # Transliterate whole word for better accuracy
+        try:
+            tr = translit('Sinhala', 'IPA', word)
+            ipa_parts.append(tr)
+            seg_parts.append(word)
+        except Exception as e:
+            print(f"Error transliterating {word}: {e}")
+            ipa_parts.append(word)
+            seg_parts.append(word)
+
+    # Join with " | "
+    return {
+        "Sinhala_Segmented": " | ".join(seg_parts),
+        "IPA": " | ".join(ipa_parts),
+    }
+
 
 def enhance_notes():
     notes_path = Path("data/anki/Vijjo/Sinhala/notes.yaml")
@@ -24,61 +71,32 @@ def enhance_notes():
         print(f"❌ Notes file not found at: {notes_path}")
         return
 
-    yaml = YAML()
-    yaml.preserve_quotes = True
-    yaml.width = 4096
-    
     with open(notes_path, "r", encoding="utf-8") as f:
-        notes = yaml.load(f) or []
+        notes = _YAML.load(f) or []
         
     print(f"Scanning {len(notes)} notes in collection...")
     count = 0
-    
-    for note in notes:
-        if "nemo_sinhala" not in note.get("tags", []):
-            continue
-            
-        sinhala_text = note["fields"].get("Sinhala", "")
-        if not sinhala_text:
+
+    # Transliteration là CPU-bound pure-Python (GIL) -> chia cho nhiều process.
+    # Bảng regex/cache ở module scope nên worker kế thừa qua fork.
+    with ProcessPoolExecutor() as executor:
+        updates = list(executor.map(_process_note, notes, chunksize=32))
+
+    for note, fields in zip(notes, updates):
+        if fields is None:
             continue
-            
-        words = sinhala_text.split()
-        seg_parts = []
-        ipa_parts = []
-        
-        for word in words:
-            # Check if Sinhala script
-            if not re.search(r'\p{Script=Sinhala}', word):
-                seg_parts.append(word)
-                ipa_parts.append(word)
-                continue
-
-            # Transliterate whole word for better accuracy
-            try:
-                tr = transliterate.process('Sinhala', 'IPA', word)
-                ipa_parts.append(tr)
-                seg_parts.append(word)
-            except Exception as e:
-                print(f"Error transliterating {word}: {e}")
-                ipa_parts.append(word)
-                seg_parts.append(word)
-
-        # Join with " | "
-        segmented = " | ".join(seg_parts)
-        ipa = " | ".join(ipa_parts)
-        
-        note["fields"]["Sinhala_Segmented"] = segmented
-        note["fields"]["IPA"] = ipa
+        note["fields"].update(fields)
+        note.setdefault("tags", []).append("ipa_v1")
         count += 1
-        
+
         if count <= 3:
-            print(f"Origin: {sinhala_text}")
-            print(f"Seg:    {segmented}")
-            print(f"IPA:    {ipa}")
+            print(f"Origin: {note['fields'].get('Sinhala', '')}")
+            print(f"Seg:    {fields['Sinhala_Segmented']}")
+            print(f"IPA:    {fields['IPA']}")
             print("-" * 20)
 
     with open(notes_path, "w", encoding="utf-8") as f:
-        yaml.dump(notes, f)
+        _YAML.dump(notes, f)
         
     print(f"✅ Enhanced {count} notes.")
 
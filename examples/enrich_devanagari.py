@@ -1,7 +1,15 @@
-import sys
 from pathlib import Path
 from ruamel.yaml import YAML
-from aksharamukha import transliterate
+
+from src.utils.translit_cache import translit
+
+# YAML typ="safe" dùng C loader/dumper, nhanh hơn nhiều lần so với
+# round-trip mode; các script này chỉ set field mới nên không cần giữ
+# comment/quote của file gốc.
+_YAML = YAML(typ="safe", pure=False)
+_YAML.default_flow_style = False
+_YAML.allow_unicode = True
+_YAML.width = 4096
 
 # Từ điển thuật ngữ Phật giáo/Sanskrit (Devanagari - Word - Meaning)
 # Nguồn: Tri thức tổng hợp
@@ -71,45 +79,51 @@ def enrich():
         print("❌ notes.yaml not found.")
         return
 
-    yaml = YAML()
-    yaml.preserve_quotes = True
-    yaml.width = 4096
-    
     with open(notes_path, "r", encoding="utf-8") as f:
-        notes = yaml.load(f) or []
-        
+        notes = _YAML.load(f) or []
+
+    # DATA có từ lặp giữa các bucket ("ज्ञान", "धर्म", "ध्यान"...); tính IPA
+    # cho tập từ duy nhất một lần thay vì cho từng occurrence trong note loop.
+    all_words = {w for bucket in DATA.values() for (w, _) in bucket}
+    ipa_map = {}
+    for w in all_words:
+        try:
+            ipa_map[w] = translit('Devanagari', 'IPA', w)
+        except:
+            ipa_map[w] = ""
+
+    # Join sẵn các chuỗi field cho từng character: vòng lặp note chỉ còn
+    # một lookup + bốn phép gán thay vì duyệt lại bucket và append ba list.
+    data_joined = {
+        c: (
+            " | ".join(w for w, _ in v),
+            " | ".join(ipa_map.get(w, "") for w, _ in v),
+            " | ".join(m for _, m in v),
+            ", ".join(w for w, _ in v),  # Cho TTS
+        )
+        for c, v in DATA.items()
+    }
+
     count = 0
     for note in notes:
+        # Idempotent: bỏ qua note đã enrich bởi phiên bản dữ liệu này
+        if note["fields"].get("Examples") and "examples_v1" in note.get("tags", []):
+            continue
+
         char = note["fields"].get("Character")
-        if char in DATA:
-            examples = DATA[char]
-            
-            ex_words = []
-            ex_ipas = []
-            ex_means = []
-            
-            for word, mean in examples:
-                # Transliterate to IPA
-                # Dùng 'Devanagari' -> 'IPA'
-                try:
-                    ipa = transliterate.process('Devanagari', 'IPA', word)
-                except:
-                    ipa = ""
-                
-                ex_words.append(word)
-                ex_ipas.append(ipa)
-                ex_means.append(mean)
-            
-            # Join with " | "
-            note["fields"]["Examples"] = " | ".join(ex_words)
-            note["fields"]["Example_IPAs"] = " | ".join(ex_ipas)
-            note["fields"]["Example_Meanings"] = " | ".join(ex_means)
-            note["fields"]["Example_Audio_Source"] = ", ".join(ex_words) # Cho TTS
-            
+        if char in data_joined:
+            ex_words, ex_ipas, ex_means, ex_audio = data_joined[char]
+
+            note["fields"]["Examples"] = ex_words
+            note["fields"]["Example_IPAs"] = ex_ipas
+            note["fields"]["Example_Meanings"] = ex_means
+            note["fields"]["Example_Audio_Source"] = ex_audio
+            note.setdefault("tags", []).append("examples_v1")
+
             count += 1
 
     with open(notes_path, "w", encoding="utf-8") as f:
-        yaml.dump(notes, f)
+        _YAML.dump(notes, f)
         
     print(f"✅ Enriched {count} notes with Buddhist terminology.")
 
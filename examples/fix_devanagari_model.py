@@ -1,7 +1,3 @@
-import sys
-from pathlib import Path
-# Add project root to path
-sys.path.append(str(Path(__file__).parent.parent))
 from src.adapters import AnkiConnectAdapter
 
 def fix_model():
@@ -20,15 +16,25 @@ def fix_model():
         print(f"❌ Model not found or error: {e}")
         return
 
+    missing = [f for f in target_fields if f not in current_fields]
     for f in target_fields:
-        if f not in current_fields:
-            try:
-                adapter.add_model_field(model_name, f)
-                print(f"✅ Added field: {f}")
-            except Exception as e:
-                print(f"❌ Failed to add field {f}: {e}")
-        else:
-            print(f"ℹ️  Field {f} exists.")
+        if f not in missing:
+            print(f"ℹ️  Field {f} already exists.")
+
+    if not missing:
+        return
+
+    # Gom tất cả modelFieldAdd vào 1 request multi (1 round-trip thay vì N)
+    actions = [
+        {"action": "modelFieldAdd", "params": {"modelName": model_name, "fieldName": f}}
+        for f in missing
+    ]
+    try:
+        adapter.multi(actions)
+        for f in missing:
+            print(f"✅ Added field: {f}")
+    except Exception as e:
+        print(f"❌ Failed to add fields {missing}: {e}")
 
 if __name__ == "__main__":
     fix_model()
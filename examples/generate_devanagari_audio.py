@@ -1,28 +1,39 @@
-import sys
+import hashlib
 import platform
-import time
 from pathlib import Path
 from ruamel.yaml import YAML
 from rich.console import Console
-from rich.progress import Progress
 
-# Add project root to path
-sys.path.append(str(Path(__file__).parent.parent))
 from src.utils.tts_google import GoogleTTS
 
+# YAML typ="safe" dùng C loader/dumper, nhanh hơn nhiều lần so với
+# round-trip mode; các script này chỉ set field mới nên không cần giữ
+# comment/quote của file gốc.
+_YAML = YAML(typ="safe", pure=False)
+_YAML.default_flow_style = False
+_YAML.allow_unicode = True
+_YAML.width = 4096
+
 API_KEY = "YOUR_API_KEY"
+MAX_WORKERS = 8  # Google TTS chịu tải tốt, bottleneck là network latency
 console = Console()
 
-def get_anki_media_path(profile: str) -> Path:
+def _compute_anki_base() -> Path:
     system = platform.system()
     home = Path.home()
     if system == "Darwin":
-        base = home / "Library/Application Support/Anki2"
-    elif system == "Windows":
-        base = home / "AppData/Roaming/Anki2"
-    else:
-        base = home / ".local/share/Anki2"
-    return base / profile / "collection.media"
+        return home / "Library/Application Support/Anki2"
+    if system == "Windows":
+        return home / "AppData/Roaming/Anki2"
+    return home / ".local/share/Anki2"
+
+
+# Platform không đổi trong đời process -> resolve một lần tại import
+_ANKI_BASE = _compute_anki_base()
+
+
+def get_anki_media_path(profile: str) -> Path:
+    return _ANKI_BASE / profile / "collection.media"
 
 def generate():
     profile = "Vijjo"
@@ -40,61 +51,61 @@ def generate():
 
     tts = GoogleTTS(API_KEY)
     
-    yaml = YAML()
-    yaml.preserve_quotes = True
-    yaml.width = 4096
-    
     with open(notes_path, "r", encoding="utf-8") as f:
-        notes = yaml.load(f) or []
+        notes = _YAML.load(f) or []
         
     console.print(f"Generating audio for {len(notes)} notes...")
-    
-    with Progress() as progress:
-        task = progress.add_task("Synthesizing...", total=len(notes))
-        
-        for note in notes:
-            char = note["fields"].get("Character")
-            name = note["fields"].get("Name")
-            examples = note["fields"].get("Examples", "") # Raw words: "word | word"
-            
-            # 1. Character Audio
-            # Text to speak: "क" (Just the char)
-            char_filename = f"Devanagari_Char_{name}.mp3"
-            char_path = media_dir / char_filename
-            
-            if not char_path.exists(): # Idempotent
-                if tts.synthesize(char, str(char_path)):
-                    note["fields"]["Audio_Character"] = f"[sound:{char_filename}]"
-                else:
-                    console.print(f"[red]Failed Char:[/red] {char}")
-            else:
-                # Ensure field is set even if file exists
-                note["fields"]["Audio_Character"] = f"[sound:{char_filename}]"
-
-            # 2. Examples Audio
-            # Parse examples from the "Examples" field (which currently holds "word | word")
-            if examples:
-                words = [w.strip() for w in examples.split("|") if w.strip()]
-                if words:
-                    # Speak with pauses: "Word1. Word2."
-                    text_to_speak = ". ".join(words)
-                    ex_filename = f"Devanagari_Ex_{name}.mp3"
-                    ex_path = media_dir / ex_filename
-                    
-                    if not ex_path.exists():
-                        if tts.synthesize(text_to_speak, str(ex_path)):
-                            note["fields"]["Audio_Examples"] = f"[sound:{ex_filename}]"
-                        else:
-                            console.print(f"[red]Failed Ex:[/red] {name}")
-                    else:
-                        note["fields"]["Audio_Examples"] = f"[sound:{ex_filename}]"
-            
-            progress.advance(task)
-            # time.sleep(0.1) # Rate limit check? Google TTS is fast usually.
+
+    # File đặt tên theo hash nội dung (content-addressable): hai note có cùng
+    # text dùng chung một file, và rerun với text không đổi là cache hit.
+    # tasks: (text, path, filename); pending_fields: filename -> [(note, field)]
+    tasks = []
+    pending_fields = {}
+
+    def schedule(text, note, field):
+        digest = hashlib.sha1(text.encode()).hexdigest()[:16]
+        filename = f"Devanagari_{digest}.mp3"
+        if (media_dir / filename).exists():  # Idempotent
+            note["fields"][field] = f"[sound:{filename}]"
+            return
+        refs = pending_fields.setdefault(filename, [])
+        if not refs:  # Text này chưa có trong batch -> synthesize một lần
+            tasks.append((text, media_dir / filename, filename))
+        refs.append((note, field))
+
+    for note in notes:
+        char = note["fields"].get("Character")
+        examples = note["fields"].get("Examples", "")  # Raw words: "word | word"
+
+        # 1. Character Audio
+        if char:
+            schedule(char, note, "Audio_Character")
+
+        # 2. Examples Audio
+        if examples:
+            words = [w.strip() for w in examples.split("|") if w.strip()]
+            if words:
+                # Speak with pauses: "Word1. Word2."
+                schedule(". ".join(words), note, "Audio_Examples")
+
+    # Một lần gọi batch cho toàn bộ request còn thiếu; GoogleTTS tự chạy
+    # song song trên connection pool của nó.
+    with console.status(f"Synthesizing {len(tasks)} clips..."):
+        results = tts.synthesize_batch(
+            [(text, str(path)) for text, path, _ in tasks],
+            max_workers=MAX_WORKERS,
+        )
+
+    for (_, _, filename), ok in zip(tasks, results):
+        if ok:
+            for note, field in pending_fields[filename]:
+                note["fields"][field] = f"[sound:{filename}]"
+        else:
+            console.print(f"[red]Failed:[/red] {filename}")
 
     # Save
     with open(notes_path, "w", encoding="utf-8") as f:
-        yaml.dump(notes, f)
+        _YAML.dump(notes, f)
         
     console.print("✅ Audio generation complete.")
 
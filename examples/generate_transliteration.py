@@ -1,17 +1,72 @@
-import sys
 import regex as re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from ruamel.yaml import YAML
-from aksharamukha import transliterate
 
-def syllabify_sinhala(text: str) -> list[str]:
+from src.utils.syllabify import syllabify_sinhala
+from src.utils.translit_cache import translit
+
+_IS_SINHALA = re.compile(r'\p{Script=Sinhala}')
+
+# YAML typ="safe" dùng C loader/dumper, nhanh hơn nhiều lần so với
+# round-trip mode; các script này chỉ set field mới nên không cần giữ
+# comment/quote của file gốc.
+_YAML = YAML(typ="safe", pure=False)
+_YAML.default_flow_style = False
+_YAML.allow_unicode = True
+_YAML.width = 4096
+
+
+def _process_note(note):
     """
-    Tách âm tiết Sinhala (Syllabification).
+    Worker cho ProcessPoolExecutor: trả về dict field mới cho một note,
+    hoặc None nếu note không cần xử lý. Merge ở main process.
     """
-    base = r'[\u0d85-\u0d96\u0d9a-\u0dc6]'
-    marks = r'(?:[\u0dca-\u0df3\u0d82-\u0d83]|\u200d)'
-    pattern = f'{base}{marks}*'
-    return re.findall(pattern, text)
+    # Idempotent: bỏ qua note đã xử lý bởi phiên bản thuật toán này
+    if note["fields"].get("Transliteration") and "translit_v1" in note.get(
+        "tags", []
+    ):
+        return None
+
+    sinhala = note["fields"].get("Sinhala", "")
+    if not sinhala:
+        return None
+
+    words = sinhala.split()
+    syl_parts = []
+    trans_parts = []
+
+    for word in words:
+        # Fast path: token thuần ASCII chắc chắn không chứa Sinhala
+        if word.isascii() or not _IS_SINHALA.search(word):
+            syl_parts.append(word)
+            trans_parts.append(word)
+            continue
+
+        syllables = syllabify_sinhala(word)
+
+        # Transliterate to ISO
+        tr_syllables = []
+        for s in syllables:
+            try:
+                tr = translit('Sinhala', 'ISO', s)
+                tr_syllables.append(tr)
+            except:
+                tr_syllables.append(s)
+
+        if syllables:
+            # Format: s1 | s2
+            syl_parts.append(" | ".join(syllables))
+            trans_parts.append(" | ".join(tr_syllables))
+        else:
+            syl_parts.append(word)
+            trans_parts.append(word)
+
+    return {
+        "Syllable_Segmented": " ".join(syl_parts),
+        "Transliteration": " ".join(trans_parts),
+    }
+
 
 def generate():
     notes_path = Path("data/anki/Vijjo/Sinhala/notes.yaml")
@@ -20,57 +75,24 @@ def generate():
         print(f"❌ Notes file not found at: {notes_path}")
         return
 
-    yaml = YAML()
-    yaml.preserve_quotes = True
-    yaml.width = 4096
-    
     with open(notes_path, "r", encoding="utf-8") as f:
-        notes = yaml.load(f) or []
+        notes = _YAML.load(f) or []
         
     print(f"Processing {len(notes)} notes...")
-    
-    for note in notes:
-        sinhala = note["fields"].get("Sinhala", "")
-        if not sinhala:
+
+    # CPU-bound (syllabify + aksharamukha) -> ProcessPoolExecutor; bảng
+    # regex và cache ở module scope nên worker kế thừa qua fork.
+    with ProcessPoolExecutor() as executor:
+        updates = list(executor.map(_process_note, notes, chunksize=32))
+
+    for note, fields in zip(notes, updates):
+        if fields is None:
             continue
-            
-        words = sinhala.split()
-        syl_parts = []
-        trans_parts = []
-        
-        for word in words:
-            if not re.search(r'\p{Script=Sinhala}', word):
-                syl_parts.append(word)
-                trans_parts.append(word)
-                continue
-                
-            syllables = syllabify_sinhala(word)
-            
-            # Transliterate to ISO
-            tr_syllables = []
-            for s in syllables:
-                try:
-                    tr = transliterate.process('Sinhala', 'ISO', s)
-                    tr_syllables.append(tr)
-                except:
-                    tr_syllables.append(s)
-            
-            if syllables:
-                # Format: s1 | s2
-                syl_word = " | ".join(syllables)
-                tr_word = " | ".join(tr_syllables)
-                
-                syl_parts.append(syl_word)
-                trans_parts.append(tr_word)
-            else:
-                syl_parts.append(word)
-                trans_parts.append(word)
-                
-        note["fields"]["Syllable_Segmented"] = " ".join(syl_parts)
-        note["fields"]["Transliteration"] = " ".join(trans_parts)
+        note["fields"].update(fields)
+        note.setdefault("tags", []).append("translit_v1")
 
     with open(notes_path, "w", encoding="utf-8") as f:
-        yaml.dump(notes, f)
+        _YAML.dump(notes, f)
         
     print("✅ Transliteration generated.")
 
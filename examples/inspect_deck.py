@@ -1,7 +1,3 @@
-import sys
-from pathlib import Path
-# Add project root to path
-sys.path.append(str(Path(__file__).parent.parent))
 from src.adapters import AnkiConnectAdapter
 
 def inspect():
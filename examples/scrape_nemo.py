@@ -1,40 +1,69 @@
-import sys
+import os
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from ruamel.yaml import YAML
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Số worker upload song song (network-bound). Override bằng env SCRAPE_WORKERS.
+MAX_WORKERS = int(os.environ.get("SCRAPE_WORKERS", "16"))
+
+# Session dùng chung với connection pool (keep-alive, tránh handshake lặp lại)
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3),
+))
 
-# Add project root to path
-sys.path.append(str(Path(__file__).parent.parent))
 from src.adapters import AnkiConnectAdapter
 
+def _collect_phrase_nodes(soup):
+    """
+    Gom cả 4 nhóm node trong một lượt duyệt DOM duy nhất, thay vì
+    3 lần find_all + 1 lần select (4 lần walk toàn bộ cây).
+    """
+    target1_list = []
+    translation_list = []
+    target2_list = []
+    audio_sources = []
+    for tag in soup.find_all(True):
+        classes = tag.get("class") or ()
+        if "target1" in classes:
+            target1_list.append(tag)
+        elif "translation" in classes:
+            translation_list.append(tag)
+        elif "target2" in classes:
+            target2_list.append(tag)
+        elif tag.name == "source" and (tag.get("src") or "").endswith(".mp3"):
+            audio_sources.append(tag)
+    return target1_list, translation_list, target2_list, audio_sources
+
+
 def scrape():
     url = "http://www.nemolanguageapps.com/phrasebooks/sinhala"
     print(f"🌍 Fetching {url}...")
     
     try:
-        response = requests.get(url)
+        response = _SESSION.get(url)
         response.raise_for_status()
     except Exception as e:
         print(f"❌ Failed to fetch page: {e}")
         return
 
     print("🔍 Parsing HTML with BeautifulSoup...")
-    soup = BeautifulSoup(response.content, "html.parser")
+    soup = BeautifulSoup(response.content, "lxml")
     
     # Tìm tất cả các container chứa phrase. 
     # Dựa trên snippet, các element này thường nằm trong <li> hoặc <div>
     # Cách an toàn nhất là tìm list các target1, translation, audio và zip chúng lại
     # nếu chúng xuất hiện theo thứ tự tương ứng.
-    
-    target1_list = soup.find_all(class_="target1")
-    translation_list = soup.find_all(class_="translation")
-    target2_list = soup.find_all(class_="target2")
-    
-    # Audio thường nằm trong thẻ audio/source ngay cạnh
-    # Ta sẽ tìm tất cả source có src đuôi mp3
-    # Lưu ý: Có thể có nhiều source (mp3, ogg), ta chỉ lấy mp3
-    audio_sources = soup.select('source[src$=".mp3"]')
+    # Audio: lấy các <source> đuôi .mp3 (bỏ ogg) — gom chung trong một pass.
+    target1_list, translation_list, target2_list, audio_sources = (
+        _collect_phrase_nodes(soup)
+    )
     
     # Kiểm tra số lượng
     count = min(len(target1_list), len(translation_list), len(target2_list))
@@ -45,22 +74,15 @@ def scrape():
         return
 
     adapter = AnkiConnectAdapter()
-    notes = []
     
     print("🚀 Processing phrases...")
     
+    # 1. Thu thập task upload trước (index, filename, url)
+    # Cần đảm bảo audio map đúng index. 
+    # Nếu trang web cấu trúc phẳng, audio_sources[i] có thể đúng.
+    # Nếu không, cần traverse từ target1 lên parent rồi tìm audio.
+    upload_tasks = []
     for i in range(count):
-        # Extract Text
-        sinhala = target1_list[i].get_text(strip=True)
-        english = translation_list[i].get_text(strip=True)
-        ipa = target2_list[i].get_text(strip=True)
-        
-        # Audio
-        # Cần đảm bảo audio map đúng index. 
-        # Nếu trang web cấu trúc phẳng, audio_sources[i] có thể đúng.
-        # Nếu không, cần traverse từ target1 lên parent rồi tìm audio.
-        
-        audio_field = ""
         if i < len(audio_sources):
             audio_url_rel = audio_sources[i]['src']
             if audio_url_rel.startswith("/"):
@@ -69,17 +91,31 @@ def scrape():
                 audio_url = audio_url_rel
                 
             audio_filename = audio_url.split("/")[-1]
-            
-            try:
-                # Upload
-                adapter.store_media_file(filename=audio_filename, url=audio_url)
-                audio_field = f"[sound:{audio_filename}]"
-                if i % 10 == 0: # Log bớt
-                    print(f"  [{i+1}/{count}] Processed: {english}")
-            except Exception as e:
-                print(f"  ⚠️ Audio error for {audio_filename}: {e}")
+            upload_tasks.append((i, audio_filename, audio_url))
+
+    # 2. Upload song song — storeMediaFile là network-bound nên thread pool ăn trọn
+    audio_fields = [""] * count
+
+    def _upload_one(task):
+        i, audio_filename, audio_url = task
+        try:
+            adapter.store_media_file(filename=audio_filename, url=audio_url)
+            return i, f"[sound:{audio_filename}]"
+        except Exception as e:
+            print(f"  ⚠️ Audio error for {audio_filename}: {e}")
+            return i, ""
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for i, audio_field in executor.map(_upload_one, upload_tasks):
+            audio_fields[i] = audio_field
+
+    # 3. Lắp notes sau khi pool hoàn tất
+    notes = []
+    for i in range(count):
+        sinhala = target1_list[i].get_text(strip=True)
+        english = translation_list[i].get_text(strip=True)
+        ipa = target2_list[i].get_text(strip=True)
 
-        # Create Note
         notes.append({
             "id": None,
             "deck": "Nemo Sinhala",
@@ -87,7 +123,7 @@ def scrape():
             "fields": {
                 "Sinhala": sinhala,
                 "English": english,
-                "Audio": audio_field,
+                "Audio": audio_fields[i],
                 "IPA": ipa
             }
         })
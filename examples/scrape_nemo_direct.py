@@ -1,13 +1,47 @@
-import sys
+import os
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from ruamel.yaml import YAML
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Số worker upload song song (network-bound). Override bằng env SCRAPE_WORKERS.
+MAX_WORKERS = int(os.environ.get("SCRAPE_WORKERS", "16"))
+
+# Session dùng chung với connection pool (keep-alive, tránh handshake lặp lại)
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3),
+))
 
-# Add project root to path
-sys.path.append(str(Path(__file__).parent.parent))
 from src.adapters import AnkiConnectAdapter
 
+def _collect_phrase_nodes(soup):
+    """
+    Gom cả 4 nhóm node trong một lượt duyệt DOM duy nhất, thay vì
+    3 lần find_all + 1 lần select (4 lần walk toàn bộ cây).
+    """
+    target1_list = []
+    translation_list = []
+    target2_list = []
+    audio_sources = []
+    for tag in soup.find_all(True):
+        classes = tag.get("class") or ()
+        if "target1" in classes:
+            target1_list.append(tag)
+        elif "translation" in classes:
+            translation_list.append(tag)
+        elif "target2" in classes:
+            target2_list.append(tag)
+        elif tag.name == "source" and (tag.get("src") or "").endswith(".mp3"):
+            audio_sources.append(tag)
+    return target1_list, translation_list, target2_list, audio_sources
+
+
 def scrape_and_generate():
     # 1. Setup Deck
     adapter = AnkiConnectAdapter()
@@ -22,42 +56,55 @@ def scrape_and_generate():
     url = "http://www.nemolanguageapps.com/phrasebooks/sinhala"
     print(f"🌍 Fetching {url}...")
     try:
-        response = requests.get(url)
+        response = _SESSION.get(url)
         response.raise_for_status()
     except Exception as e:
         print(f"❌ Failed to fetch: {e}")
         return
 
-    soup = BeautifulSoup(response.content, "html.parser")
-    target1_list = soup.find_all(class_="target1")
-    translation_list = soup.find_all(class_="translation")
-    target2_list = soup.find_all(class_="target2")
-    audio_sources = soup.select('source[src$=".mp3"]')
+    soup = BeautifulSoup(response.content, "lxml")
+    target1_list, translation_list, target2_list, audio_sources = (
+        _collect_phrase_nodes(soup)
+    )
     
     count = min(len(target1_list), len(translation_list), len(target2_list))
     print(f"✨ Found {count} phrases.")
 
-    notes = []
     print("🚀 Processing and Mapping to 'Sinhala' Model...")
-    
+
+    # 1. Thu thập task upload (index, filename, url)
+    upload_tasks = []
     for i in range(count):
-        # Extract
-        sinhala_text = target1_list[i].get_text(strip=True)
-        english_text = translation_list[i].get_text(strip=True)
-        ipa_text = target2_list[i].get_text(strip=True)
-        
-        # Audio
-        audio_field = ""
         if i < len(audio_sources):
             audio_url_rel = audio_sources[i]['src']
             audio_url = f"http://www.nemolanguageapps.com{audio_url_rel}" if audio_url_rel.startswith("/") else audio_url_rel
             audio_filename = audio_url.split("/")[-1]
-            
-            try:
-                adapter.store_media_file(filename=audio_filename, url=audio_url)
-                audio_field = f"[sound:{audio_filename}]"
-            except Exception as e:
-                print(f"  ⚠️ Audio error: {e}")
+            upload_tasks.append((i, audio_filename, audio_url))
+
+    # 2. Upload song song qua thread pool (network-bound)
+    audio_fields = [""] * count
+
+    def _upload_one(task):
+        i, audio_filename, audio_url = task
+        try:
+            adapter.store_media_file(filename=audio_filename, url=audio_url)
+            return i, f"[sound:{audio_filename}]"
+        except Exception as e:
+            print(f"  ⚠️ Audio error: {e}")
+            return i, ""
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for i, audio_field in executor.map(_upload_one, upload_tasks):
+            audio_fields[i] = audio_field
+
+    # 3. Lắp notes
+    notes = []
+    for i in range(count):
+        # Extract
+        sinhala_text = target1_list[i].get_text(strip=True)
+        english_text = translation_list[i].get_text(strip=True)
+        ipa_text = target2_list[i].get_text(strip=True)
+        audio_field = audio_fields[i]
 
         # Map to 'Sinhala' Model Fields
         # Fields: ['English', 'Sinhala', 'A_Sinhala_Male', 'A_Sinhala_Female', 'A_English', 'IPA', 'Sinhala_Segmented']
@@ -1,7 +1,3 @@
-import sys
-from pathlib import Path
-# Add project root to path
-sys.path.append(str(Path(__file__).parent.parent))
 from src.adapters import AnkiConnectAdapter
 
 def setup():
@@ -16,15 +12,25 @@ def setup():
         print(f"❌ Could not get model fields: {e}")
         return
     
+    missing = [f for f in new_fields if f not in current_fields]
     for f in new_fields:
-        if f not in current_fields:
-            try:
-                adapter.add_model_field(model, f)
-                print(f"✅ Added field: {f}")
-            except Exception as e:
-                print(f"❌ Failed to add {f}: {e}")
-        else:
+        if f not in missing:
             print(f"ℹ️  Field {f} already exists.")
 
+    if not missing:
+        return
+
+    # Gom tất cả modelFieldAdd vào 1 request multi (1 round-trip thay vì N)
+    actions = [
+        {"action": "modelFieldAdd", "params": {"modelName": model, "fieldName": f}}
+        for f in missing
+    ]
+    try:
+        adapter.multi(actions)
+        for f in missing:
+            print(f"✅ Added field: {f}")
+    except Exception as e:
+        print(f"❌ Failed to add fields {missing}: {e}")
+
 if __name__ == "__main__":
     setup()
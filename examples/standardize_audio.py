@@ -1,73 +1,94 @@
-import sys
+import asyncio
+import os
 import re
-import subprocess
 import platform
 from pathlib import Path
-from typing import Tuple, Optional
-from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 from ruamel.yaml import YAML
 from rich.console import Console
 from rich.progress import Progress
 
 console = Console()
 
-def get_anki_media_path(profile: str) -> Path:
+# Character class thay vì .+? non-greedy: quét tuyến tính, không backtracking
+_SOUND_RE = re.compile(r'\[sound:([^\]]+)\]')
+
+# Pass scan chỉ đọc dữ liệu -> typ="safe" dùng C loader, nhanh hơn nhiều
+# so với round-trip mode trên file hàng nghìn note.
+_YAML_SAFE = YAML(typ="safe", pure=False)
+
+def _compute_anki_base() -> Path:
     system = platform.system()
     home = Path.home()
     if system == "Darwin": # MacOS
-        base = home / "Library/Application Support/Anki2"
-    elif system == "Windows":
-        base = home / "AppData/Roaming/Anki2"
-    else: # Linux
-        base = home / ".local/share/Anki2"
-    
-    media_path = base / profile / "collection.media"
+        return home / "Library/Application Support/Anki2"
+    if system == "Windows":
+        return home / "AppData/Roaming/Anki2"
+    return home / ".local/share/Anki2" # Linux
+
+
+# Tính một lần tại import: platform.system() là uname syscall mỗi lần gọi
+_ANKI_BASE = _compute_anki_base()
+
+
+def get_anki_media_path(profile: str) -> Path:
+    media_path = _ANKI_BASE / profile / "collection.media"
     if not media_path.exists():
         # Fallback check for common custom paths or raise
         raise FileNotFoundError(f"Could not find Anki media folder at {media_path}")
     return media_path
 
-def process_audio_file(args: Tuple[Path, Path]) -> Optional[str]:
+# FFmpeg Filter Complex
+# 1. Trim Silence Start (-65dB)
+# 2. Reverse -> Trim Silence End -> Reverse
+# 3. Loudnorm (-15 LUFS)
+# 4. Pad 200ms Start & End
+_FILTER_CMD = (
+    "silenceremove=start_periods=1:start_duration=0:start_threshold=-65dB:detection=peak,"
+    "areverse,"
+    "silenceremove=start_periods=1:start_duration=0:start_threshold=-65dB:detection=peak,"
+    "areverse,"
+    "loudnorm=I=-15:TP=-1.5:LRA=11,"
+    "adelay=200|200,"
+    "apad=pad_dur=0.2"
+)
+
+
+async def _run_ffmpeg(
+    sem: asyncio.Semaphore, input_path: Path, output_path: Path
+) -> Optional[str]:
     """
-    Worker function to process one audio file using FFmpeg.
-    Returns: None on success, error string on failure.
+    Chạy FFmpeg cho một file, giới hạn song song bằng semaphore.
+    Returns: None nếu thành công, chuỗi lỗi nếu thất bại.
+
+    Input/output existence đã được lọc một lần bằng os.scandir ở main —
+    ở đây chỉ việc spawn ffmpeg, không stat() lại.
     """
-    input_path, output_path = args
-    
-    if not input_path.exists():
-        # Có thể file chưa được sync về máy? Hoặc tên sai.
-        return f"File not found: {input_path.name}"
-    
-    if output_path.exists():
-        return None # Skip if exists
-
-    # FFmpeg Filter Complex
-    # 1. Trim Silence Start (-65dB)
-    # 2. Reverse -> Trim Silence End -> Reverse
-    # 3. Loudnorm (-15 LUFS)
-    # 4. Pad 200ms Start & End
-    filter_cmd = (
-        "silenceremove=start_periods=1:start_duration=0:start_threshold=-65dB:detection=peak,"
-        "areverse,"
-        "silenceremove=start_periods=1:start_duration=0:start_threshold=-65dB:detection=peak,"
-        "areverse,"
-        "loudnorm=I=-15:TP=-1.5:LRA=11,"
-        "adelay=200|200,"
-        "apad=pad_dur=0.2"
-    )
-
-    cmd = [
-        "ffmpeg", "-y", "-v", "error",
-        "-i", str(input_path),
-        "-af", filter_cmd,
-        str(output_path)
-    ]
+    async with sem:
+        proc = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-y", "-v", "error",
+            "-i", str(input_path),
+            "-af", _FILTER_CMD,
+            str(output_path),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await proc.communicate()
+
+    if proc.returncode != 0:
+        return f"FFmpeg error for {input_path.name}: {stderr.decode()}"
+    return None
+
+
+async def _standardize_all(tasks, workers, progress, task_id) -> None:
+    sem = asyncio.Semaphore(workers)
+    coros = [_run_ffmpeg(sem, inp, out) for inp, out in tasks]
+    for fut in asyncio.as_completed(coros):
+        res = await fut
+        if res:
+            console.print(f"[red]Error:[/red] {res}")
+        progress.advance(task_id)
 
-    try:
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
-        return None
-    except subprocess.CalledProcessError as e:
-        return f"FFmpeg error for {input_path.name}: {e.stderr.decode()}"
 
 def main():
     profile = "Vijjo"
@@ -85,16 +106,16 @@ def main():
         console.print(f"[red]Notes YAML not found at {yaml_path}[/red]")
         return
 
-    # 2. Load YAML & Collect Files
-    yaml = YAML()
-    yaml.preserve_quotes = True
-    yaml.width = 4096
-    
+    # 2. Load YAML & Collect Files (scan pass: safe loader là đủ)
     with open(yaml_path, "r", encoding="utf-8") as f:
-        notes = yaml.load(f) or []
+        notes = _YAML_SAFE.load(f) or []
+
+    # Một lượt getdents trên media dir thay cho hai stat() mỗi file trong worker
+    existing_files = {entry.name for entry in os.scandir(media_dir)}
 
     tasks = [] # List of (input, output)
     replacements = {} # Map old_filename -> new_filename
+    missing_inputs = [] # Input không có trên máy (chưa sync?)
     
     # Filter notes with tag "nemo_sinhala"
     nemo_notes = [n for n in notes if "nemo_sinhala" in n.get("tags", [])]
@@ -103,72 +124,71 @@ def main():
     for note in nemo_notes:
         for field_name, field_value in note["fields"].items():
             # Find all audio tags in this field
-            matches = list(re.finditer(r'\[sound:(.+?)\]', field_value))
-            for match in matches:
+            for match in _SOUND_RE.finditer(field_value):
                 filename = match.group(1)
                 
                 # Check suffix
                 if "-standardized" in filename:
                     continue 
                 
-                name_stem = Path(filename).stem
-                ext = Path(filename).suffix
+                # os.path.splitext trả cả stem lẫn ext trong một lần gọi,
+                # khỏi dựng hai PurePath cho mỗi match
+                name_stem, ext = os.path.splitext(filename)
                 new_filename = f"{name_stem}-standardized{ext}"
                 
                 input_file = media_dir / filename
                 output_file = media_dir / new_filename
-                
-                tasks.append((input_file, output_file))
-                
+
+                if filename not in existing_files:
+                    # Có thể file chưa được sync về máy? Hoặc tên sai.
+                    missing_inputs.append(filename)
+                elif new_filename not in existing_files:
+                    tasks.append((input_file, output_file))
+
                 # Store replacement needed (Scope: Global replacements map might be risky if filenames clash, 
                 # but Anki media filenames are flat, so it's okay)
                 replacements[filename] = new_filename
 
+    for filename in missing_inputs:
+        console.print(f"[red]Error:[/red] File not found: {filename}")
+
     # 3. Execute Multiprocessing
-    unique_tasks = list(set(tasks)) # Remove duplicates
+    # dict.fromkeys: dedup O(N) nhưng giữ thứ tự liệt kê -> đọc file media
+    # gần tuần tự hơn, page cache làm việc tốt hơn
+    unique_tasks = list(dict.fromkeys(tasks))
     
     if not unique_tasks:
         console.print("[yellow]No new audio files to process.[/yellow]")
     else:
         console.print(f"Processing [bold cyan]{len(unique_tasks)}[/bold cyan] audio files with FFmpeg...")
         
+        # ffmpeg là process riêng nên không cần pool worker Python trung gian:
+        # asyncio spawn trực tiếp + semaphore giới hạn song song, khỏi trả giá
+        # fork/pickle per task. ffmpeg tự đa luồng -> nửa số core là đủ.
+        workers = max(1, (os.cpu_count() or 2) // 2)
+
         with Progress() as progress:
             task_id = progress.add_task("Standardizing...", total=len(unique_tasks))
-            
-            with ProcessPoolExecutor() as executor:
-                results = executor.map(process_audio_file, unique_tasks)
-                
-                for res in results:
-                    if res:
-                        console.print(f"[red]Error:[/red] {res}")
-                    progress.advance(task_id)
+            asyncio.run(_standardize_all(unique_tasks, workers, progress, task_id))
 
     # 4. Update YAML References
+    # Thay đổi chỉ nằm trong token [sound:...], không thể vượt qua ranh giới
+    # cú pháp YAML -> patch thẳng trên text gốc, giữ nguyên format/comment mà
+    # không tốn một lượt parse + re-serialize round-trip toàn bộ file.
     if replacements:
         console.print("Updating notes.yaml references...")
-        updates_count = 0
-        for note in nemo_notes:
-            note_updated = False
-            for field_name, field_value in note["fields"].items():
-                new_value = field_value
-                for old, new in replacements.items():
-                    if old in new_value:
-                        new_value = new_value.replace(old, new)
-                
-                if new_value != field_value:
-                    note["fields"][field_name] = new_value
-                    note_updated = True
-            
-            if note_updated:
-                updates_count += 1
-
-        if updates_count > 0:
-            with open(yaml_path, "w", encoding="utf-8") as f:
-                yaml.dump(notes, f)
-            console.print(f"[green]Updated {updates_count} notes in YAML.[/green]")
+
+        def _repl(m):
+            return f"[sound:{replacements.get(m.group(1), m.group(1))}]"
+
+        raw = yaml_path.read_text(encoding="utf-8")
+        new_raw = _SOUND_RE.sub(_repl, raw)
+        if new_raw != raw:
+            yaml_path.write_text(new_raw, encoding="utf-8")
+            console.print("[green]Updated audio references in YAML.[/green]")
             console.print("👉 Now run [bold]anki-vibe sync[/bold] to push changes.")
         else:
-            console.print("No YAML updates applied (Logic check needed).")
+            console.print("No YAML updates applied (references already current).")
     else:
         console.print("No replacements needed.")
 
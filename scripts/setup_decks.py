@@ -1,21 +1,22 @@
-import sys
-from pathlib import Path
-
-# Add project root to path
-sys.path.append(str(Path(__file__).parent.parent))
-
 from src.adapters import AnkiConnectAdapter
 
 def create_decks():
     adapter = AnkiConnectAdapter()
     decks = ["AnkiVibe::TestDeck", "AnkiVibe::TestDeck::SubDeck"]
-    
-    for deck in decks:
-        try:
-            adapter.create_deck(deck)
+
+    # Gom cả batch vào một action 'multi' -> một HTTP round-trip duy nhất
+    actions = [{"action": "createDeck", "params": {"deck": d}} for d in decks]
+    try:
+        results = adapter.multi(actions)
+    except Exception as e:
+        print(f"❌ Failed to create decks: {e}")
+        return
+
+    for deck, result in zip(decks, results):
+        if isinstance(result, dict) and result.get("error"):
+            print(f"❌ Failed to create deck {deck}: {result['error']}")
+        else:
             print(f"✅ Created deck: {deck}")
-        except Exception as e:
-            print(f"❌ Failed to create deck {deck}: {e}")
 
 if __name__ == "__main__":
-    create_decks()
\ No newline at end of file
+    create_decks()
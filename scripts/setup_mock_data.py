@@ -1,13 +1,15 @@
-import sys
-from pathlib import Path
-from ruamel.yaml import YAML
-
-# Add project root to path
-sys.path.append(str(Path(__file__).parent.parent))
+import yaml
 
 from src.core.config import settings
 from src.core.anki_detector import detect_active_profile
 
+# libyaml C dumper nhanh hơn nhiều lần; fallback pure-Python nếu PyYAML
+# được build không kèm libyaml.
+try:
+    _Dumper = yaml.CSafeDumper
+except AttributeError:
+    _Dumper = yaml.SafeDumper
+
 
 def create_mock_data():
     profile = detect_active_profile()
@@ -24,13 +26,12 @@ def create_mock_data():
 
     # 2. Tạo config.yaml
     # Map folder này vào Note Type "Basic" của Anki
-    yaml = YAML()
     config = {
         "anki_model_name": "Basic",
         "description": "Mock data created for testing Push feature",
     }
     with open(project_dir / "config.yaml", "w", encoding="utf-8") as f:
-        yaml.dump(config, f)
+        yaml.dump(config, f, Dumper=_Dumper, allow_unicode=True, sort_keys=False)
 
     # 3. Tạo notes.yaml (Chưa có ID)
     # Chúng ta sẽ đẩy vào Deck mới là "AnkiVibe::TestDeck"
@@ -62,7 +63,7 @@ def create_mock_data():
     ]
 
     with open(project_dir / "notes.yaml", "w", encoding="utf-8") as f:
-        yaml.dump(notes, f)
+        yaml.dump(notes, f, Dumper=_Dumper, allow_unicode=True, sort_keys=False)
 
     print(f"✅ Created mock data at: {project_dir}")
     print("👉 Now run: poetry run python src/main.py sync")
@@ -1,4 +1,17 @@
 # Path: src/adapters/__init__.py
+from functools import lru_cache
+
 from .anki_connect import AnkiConnectAdapter
 
-__all__ = ["AnkiConnectAdapter"]
\ No newline at end of file
+
+@lru_cache(maxsize=1)
+def get_adapter() -> AnkiConnectAdapter:
+    """
+    Adapter dùng chung cho cả process: một Session (connection pool,
+    keep-alive) và một model cache phục vụ mọi command thay vì mỗi nơi
+    tự dựng adapter mới.
+    """
+    return AnkiConnectAdapter()
+
+
+__all__ = ["AnkiConnectAdapter", "get_adapter"]
@@ -1,26 +1,102 @@
 # Path: src/adapters/anki_connect.py
 import json
 import logging
+import time
 import requests
-from typing import Any, Dict, List, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 from src.core.config import settings
 
-__all__ = ["AnkiConnectAdapter", "AnkiConnectError"]
+# orjson (Rust) encode/decode nhanh hơn stdlib nhiều lần trên payload
+# note lớn; optional — thiếu thì dùng json mặc định của requests.
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+__all__ = ["AnkiConnectAdapter", "AnkiConnectError", "BatchResult"]
 
 logger = logging.getLogger(__name__)
 
+# Sentinel phân biệt "error key không tồn tại" với "error = None"
+_MISSING = object()
+
 class AnkiConnectError(Exception):
     """Custom exception for logical errors returned by AnkiConnect."""
     pass
 
+
+class BatchResult:
+    """
+    Placeholder cho kết quả của một action bên trong adapter.batch().
+    Giá trị thật được điền vào .value sau khi batch flush.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value: Any = None
+
 class AnkiConnectAdapter:
     """
     Adapter để giao tiếp với Anki thông qua AnkiConnect Add-on.
     Document: https://foosoft.net/projects/anki-connect/
     """
 
-    def __init__(self, base_url: str = settings.ANKI_CONNECT_URL):
+    # Metadata model (fields/templates/css) hiếm khi đổi trong một run
+    MODEL_CACHE_TTL = 30.0
+
+    # Trên ngưỡng này, chia notesInfo/cardsInfo thành chunk chạy song song:
+    # Anki xử lý từng chunk trong khi chunk khác còn đang trên đường truyền
+    INFO_CHUNK_SIZE = 500
+
+    def __init__(self, base_url: str = settings.ANKI_CONNECT_URL) -> None:
         self.base_url = base_url
+        # (action, model_name) -> (monotonic timestamp, cached value)
+        self._model_cache: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+        # Hàng đợi action khi đang trong batch(); None = gửi thẳng
+        self._batch: Optional[List[Tuple[Dict[str, Any], "BatchResult"]]] = None
+        # Tập deck/model đã biết tồn tại (lazy, cho ensure_deck/ensure_model)
+        self._known_decks: Optional[set[str]] = None
+        self._known_models: Optional[set[str]] = None
+        # Session keep-alive: giữ nguyên một kết nối TCP tới AnkiConnect
+        # thay vì handshake lại cho từng request (đáng kể khi sync hàng
+        # nghìn action qua localhost). Pool đủ rộng cho _invoke_parallel
+        # bắn 8 request in-flight mà không phải mở/đóng socket thêm.
+        # (AnkiConnect chỉ nói HTTP/1.1 trên localhost — HTTP/2 multiplexing
+        # qua httpx không đem lại gì ở đây; keep-alive pool là đủ.)
+        # Retry chỉ cho 5xx: Anki bận (đang sync/checkpoint) trả 502-504
+        # thoáng qua; backoff 0.2/0.4/0.8s là đủ. KHÔNG retry connection
+        # refused — Anki chưa mở thì retry chỉ trì hoãn thông báo lỗi.
+        retry = Retry(
+            total=3,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["POST"]),
+            connect=0,
+        )
+        self._session = requests.Session()
+        # Loopback: băng thông không phải bottleneck, gzip chỉ tốn CPU hai
+        # đầu khi notesInfo trả hàng chục MB. Identity = đọc bytes thẳng.
+        self._session.headers.update(
+            {"Accept-Encoding": "identity", "Connection": "keep-alive"}
+        )
+        self._session.mount(
+            "http://",
+            HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry),
+        )
+
+    def close(self) -> None:
+        """Đóng connection pool. Idempotent."""
+        self._session.close()
+
+    def __enter__(self) -> "AnkiConnectAdapter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.close()
 
     def _invoke(self, action: str, **params: Any) -> Any:
         """
@@ -37,6 +113,12 @@ class AnkiConnectAdapter:
             ConnectionError: Nếu không kết nối được với Anki (Anki chưa mở).
             AnkiConnectError: Nếu Anki trả về lỗi logic (ví dụ: sai tên deck).
         """
+        # Đang trong batch(): xếp hàng thay vì gửi, trả placeholder
+        if self._batch is not None:
+            placeholder = BatchResult()
+            self._batch.append(({"action": action, "params": params}, placeholder))
+            return placeholder
+
         payload = {
             "action": action,
             "version": 6,
@@ -45,21 +127,46 @@ class AnkiConnectAdapter:
         
         try:
             # Timeout 30s để tránh treo app nếu Anki đang xử lý nặng
-            response = requests.post(self.base_url, json=payload, timeout=30)
-            response.raise_for_status() 
-            
-            response_data = response.json()
-            
-            # Kiểm tra format chuẩn của AnkiConnect
-            if len(response_data) != 2:
-                raise AnkiConnectError("Response has an unexpected number of fields.")
-                
-            if "error" not in response_data:
+            if orjson is not None:
+                response = self._session.post(
+                    self.base_url,
+                    data=orjson.dumps(payload),
+                    headers={"Content-Type": "application/json"},
+                    timeout=30,
+                )
+            else:
+                # Compact separators: bỏ khoảng trắng sau ,/: — payload nhỏ
+                # hơn ~5% và encode nhanh hơn so với default của json.dumps
+                response = self._session.post(
+                    self.base_url,
+                    data=json.dumps(payload, separators=(",", ":")).encode(),
+                    headers={"Content-Type": "application/json"},
+                    timeout=30,
+                )
+
+            # AnkiConnect luôn trả 200 kể cả khi lỗi logic (báo qua envelope),
+            # nên chỉ cần chặn lỗi hạ tầng 5xx — một phép so sánh int thay vì
+            # raise_for_status() tra cứu message cho mọi call.
+            if response.status_code >= 500:
+                raise ConnectionError(
+                    f"AnkiConnect returned HTTP {response.status_code}"
+                )
+
+            # Decode cũng qua orjson khi có: response notesInfo hàng chục
+            # nghìn note với field HTML là chỗ stdlib json tốn CPU nhất
+            if orjson is not None:
+                response_data = orjson.loads(response.content)
+            else:
+                response_data = response.json()
+
+            # Envelope chuẩn luôn là {"result":..., "error":...} — một lần
+            # dict.get với sentinel thay cho check len + membership riêng lẻ
+            error_msg = response_data.get("error", _MISSING)
+            if error_msg is _MISSING:
                 raise AnkiConnectError("Response is missing required error field.")
-                
+
             # Kiểm tra lỗi logic từ phía Anki
-            if response_data["error"] is not None:
-                error_msg = response_data["error"]
+            if error_msg is not None:
                 logger.error(f"AnkiConnect Error [{action}]: {error_msg}")
                 raise AnkiConnectError(f"{error_msg}")
                 
@@ -87,7 +194,11 @@ class AnkiConnectAdapter:
         Chuyển profile Anki.
         Lưu ý: Lệnh này sẽ force sync và reload GUI Anki.
         """
-        return self._invoke("loadProfile", name=name)
+        result = self._invoke("loadProfile", name=name)
+        # Profile vừa đổi -> kết quả detect_active_profile đang cache đã cũ
+        from src.core.anki_detector import invalidate_profile_cache
+        invalidate_profile_cache()
+        return result
 
     # =========================================================================
     # METADATA RETRIEVAL (Decks, Models)
@@ -101,23 +212,80 @@ class AnkiConnectAdapter:
         """Lấy danh sách tên tất cả các Note Types (Models)."""
         return self._invoke("modelNames")
 
+    def _cached_model_invoke(self, action: str, model_name: str) -> Any:
+        """
+        Gọi một action metadata theo model, cache trong MODEL_CACHE_TTL giây.
+        Sync một batch N note hỏi đi hỏi lại cùng schema — cache biến N×M
+        round-trip thành M lần fetch.
+        """
+        key = (action, model_name)
+        cached = self._model_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.MODEL_CACHE_TTL:
+            return cached[1]
+
+        value = self._invoke(action, modelName=model_name)
+        self._model_cache[key] = (time.monotonic(), value)
+        return value
+
+    def invalidate_model_cache(self, model_name: Optional[str] = None) -> None:
+        """Xóa cache metadata (một model hoặc toàn bộ) sau khi mutate."""
+        if model_name is None:
+            self._model_cache.clear()
+        else:
+            for key in [k for k in self._model_cache if k[1] == model_name]:
+                del self._model_cache[key]
+
     def get_model_field_names(self, model_name: str) -> List[str]:
-        """Lấy danh sách tên các Field của một Note Type."""
-        return self._invoke("modelFieldNames", modelName=model_name)
+        """Lấy danh sách tên các Field của một Note Type (có cache)."""
+        return self._cached_model_invoke("modelFieldNames", model_name)
 
     def get_model_templates(self, model_name: str) -> Dict[str, Any]:
         """
-        Lấy thông tin templates (Front/Back HTML) của Model.
+        Lấy thông tin templates (Front/Back HTML) của Model (có cache).
         Returns: Dict dạng { "Card Name": {"qfmt": "...", "afmt": "..."}, ... }
         """
-        return self._invoke("modelTemplates", modelName=model_name)
+        return self._cached_model_invoke("modelTemplates", model_name)
 
     def get_model_styling(self, model_name: str) -> Dict[str, str]:
         """
-        Lấy CSS của Model.
+        Lấy CSS của Model (có cache).
         Returns: Dict dạng { "css": "..." }
         """
-        return self._invoke("modelStyling", modelName=model_name)
+        return self._cached_model_invoke("modelStyling", model_name)
+
+    def get_models_bundle(
+        self, model_names: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Lấy fields + templates + styling cho nhiều model trong MỘT 'multi'.
+
+        3N round-trip thành 1; kết quả đồng thời được seed vào model cache
+        nên các getter lẻ sau đó là cache hit.
+
+        Returns:
+            { model_name: {"fields": [...], "templates": {...},
+                           "styling": {...}}, ... }
+        """
+        _ACTIONS = ("modelFieldNames", "modelTemplates", "modelStyling")
+        actions = [
+            {"action": action, "params": {"modelName": m}}
+            for m in model_names
+            for action in _ACTIONS
+        ]
+        results = self.multi(actions)
+
+        now = time.monotonic()
+        bundle: Dict[str, Dict[str, Any]] = {}
+        for i, m in enumerate(model_names):
+            fields, templates, styling = results[i * 3:i * 3 + 3]
+            for action, value in zip(_ACTIONS, (fields, templates, styling)):
+                self._model_cache[(action, m)] = (now, value)
+            bundle[m] = {
+                "fields": fields,
+                "templates": templates,
+                "styling": styling,
+            }
+        return bundle
 
     # =========================================================================
     # DECK OPERATIONS
@@ -130,11 +298,26 @@ class AnkiConnectAdapter:
         """
         return self._invoke("createDeck", deck=deck_name)
 
+    def ensure_deck(self, deck_name: str) -> None:
+        """
+        Đảm bảo Deck tồn tại, không tốn round-trip cho deck đã biết.
+        Lần đầu gọi sẽ nạp danh sách deck hiện có; các lần sau chỉ là một
+        phép kiểm tra set membership.
+        """
+        if self._known_decks is None:
+            self._known_decks = set(self.get_deck_names())
+        if deck_name in self._known_decks:
+            return
+        self.create_deck(deck_name)
+        self._known_decks.add(deck_name)
+
     def delete_decks(self, deck_names: List[str]) -> None:
         """
         Xóa danh sách Decks.
         """
         self._invoke("deleteDecks", decks=deck_names, cardsToo=True)
+        # Tập deck đã biết không còn tin được sau khi xóa
+        self._known_decks = None
 
     # =========================================================================
     # MODEL OPERATIONS
@@ -157,22 +340,37 @@ class AnkiConnectAdapter:
                 }
             ]
         }
-        return self._invoke("createModel", **params)
+        result = self._invoke("createModel", **params)
+        if self._known_models is not None:
+            self._known_models.add(model_name)
+        return result
+
+    def ensure_model_exists(self, model_name: str) -> bool:
+        """
+        Kiểm tra Model tồn tại qua tập tên đã cache (nạp lazy một lần).
+        Returns: True nếu model đã có trong Anki.
+        """
+        if self._known_models is None:
+            self._known_models = set(self.get_model_names())
+        return model_name in self._known_models
 
-    def add_model_field(self, model_name: str, field_name: str, index: int = None) -> Dict[str, Any]:
+    def add_model_field(self, model_name: str, field_name: str, index: Optional[int] = None) -> Dict[str, Any]:
         """
         Thêm field mới vào Model.
         """
         params = {"modelName": model_name, "fieldName": field_name}
         if index is not None:
             params["index"] = index
-        return self._invoke("modelFieldAdd", **params)
+        result = self._invoke("modelFieldAdd", **params)
+        # Schema vừa đổi -> cache cho model này không còn đúng
+        self.invalidate_model_cache(model_name)
+        return result
 
     # =========================================================================
     # MEDIA OPERATIONS
     # =========================================================================
 
-    def store_media_file(self, filename: str, data_base64: str = None, path: str = None, url: str = None) -> str:
+    def store_media_file(self, filename: str, data_base64: Optional[str] = None, path: Optional[str] = None, url: Optional[str] = None) -> str:
         """
         Lưu file media vào Anki collection.media folder.
         Có thể cung cấp:
@@ -203,36 +401,66 @@ class AnkiConnectAdapter:
         """
         return self._invoke("findNotes", query=query)
 
+    def get_notes_mod_time(self, note_ids: List[int]) -> List[Dict[str, Any]]:
+        """
+        Lấy mod time của danh sách Note IDs (rẻ hơn notesInfo rất nhiều).
+        Returns: List dạng [{"noteId": ..., "mod": ...}, ...].
+        """
+        if not note_ids:
+            return []
+        return self._invoke("notesModTime", notes=note_ids)
+
     def get_notes_info(self, note_ids: List[int]) -> List[Dict[str, Any]]:
         """
         Lấy thông tin chi tiết (fields, tags, model) của danh sách Note IDs.
+        Danh sách lớn được chia chunk INFO_CHUNK_SIZE và fan-out song song;
+        kết quả ghép lại đúng thứ tự input.
         """
         if not note_ids:
             return []
-        return self._invoke("notesInfo", notes=note_ids)
+        if len(note_ids) <= self.INFO_CHUNK_SIZE:
+            return self._invoke("notesInfo", notes=note_ids)
 
-    # =========================================================================
-    # WRITE OPERATIONS (Placeholder for Future Use)
-    # =========================================================================
-    
-    def update_note_fields(self, note_id: int, fields: Dict[str, str]) -> None:
+        chunks = [
+            note_ids[i:i + self.INFO_CHUNK_SIZE]
+            for i in range(0, len(note_ids), self.INFO_CHUNK_SIZE)
+        ]
+        results = self._invoke_parallel([("notesInfo", {"notes": c}) for c in chunks])
+        return [note for chunk in results for note in chunk]
+
+    def stream_notes_info(
+        self, note_ids: List[int], chunk_size: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
         """
-        Cập nhật nội dung fields của một note cụ thể.
+        Generator yield từng note dict, fetch theo chunk.
+
+        Khác get_notes_info: không materialize toàn bộ response trong RAM —
+        peak memory chỉ là một chunk, hữu ích khi caller duyệt/filter 50k
+        note mà không cần giữ hết. Dùng y như bản list:
+            for note in adapter.stream_notes_info(ids): ...
         """
-        note_data = {
-            "id": note_id,
-            "fields": fields
-        }
-        self._invoke("updateNoteFields", note=note_data)
-    
+        if chunk_size is None:
+            chunk_size = self.INFO_CHUNK_SIZE
+        for i in range(0, len(note_ids), chunk_size):
+            yield from self._invoke("notesInfo", notes=note_ids[i:i + chunk_size])
+
     def get_cards_info(self, card_ids: List[int]) -> List[Dict[str, Any]]:
         """
         Lấy thông tin chi tiết của danh sách Card IDs.
         Dùng để xác định Deck Name của một Note.
+        Chia chunk song song như get_notes_info với danh sách lớn.
         """
         if not card_ids:
             return []
-        return self._invoke("cardsInfo", cards=card_ids)
+        if len(card_ids) <= self.INFO_CHUNK_SIZE:
+            return self._invoke("cardsInfo", cards=card_ids)
+
+        chunks = [
+            card_ids[i:i + self.INFO_CHUNK_SIZE]
+            for i in range(0, len(card_ids), self.INFO_CHUNK_SIZE)
+        ]
+        results = self._invoke_parallel([("cardsInfo", {"cards": c}) for c in chunks])
+        return [card for chunk in results for card in chunk]
     
     # =========================================================================
     # BATCH OPERATIONS (Performance Optimization)
@@ -245,16 +473,93 @@ class AnkiConnectAdapter:
         """
         return self._invoke("multi", actions=actions)
 
+    @contextmanager
+    def batch(self) -> Iterator["AnkiConnectAdapter"]:
+        """
+        Gom mọi lời gọi adapter trong with-block thành một action 'multi'.
+
+        Ví dụ:
+            with adapter.batch():
+                for note in notes:
+                    adapter.update_note_fields(note_id, fields)
+        => một HTTP round-trip cho N update thay vì N round-trip.
+
+        Bên trong block mỗi call trả về BatchResult; đọc .value sau khi
+        thoát block. Không dùng cho call mà kết quả cần ngay để rẽ nhánh.
+        Batch bị hủy (không gửi) nếu block raise.
+        """
+        if self._batch is not None:
+            raise RuntimeError("batch() cannot be nested")
+        self._batch = []
+        try:
+            yield self
+        except BaseException:
+            self._batch = None
+            raise
+
+        queued, self._batch = self._batch, None
+        if queued:
+            results = self._invoke("multi", actions=[a for a, _ in queued])
+            for (_, placeholder), result in zip(queued, results):
+                placeholder.value = result
+
+    def _invoke_parallel(self, calls: List[Tuple[str, Dict[str, Any]]]) -> List[Any]:
+        """
+        Chạy nhiều _invoke đồng thời qua thread pool (khi op không gom được
+        vào 'multi'). Session thread-safe cho POST; AnkiConnect phục vụ
+        đơn luồng nên queue depth ~8 là đủ bão hoà, sâu hơn không thêm lợi.
+
+        Args:
+            calls: List các tuple (action, params dict).
+
+        Returns:
+            List kết quả theo đúng thứ tự input.
+        """
+        if not calls:
+            return []
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(self._invoke, action, **params)
+                for action, params in calls
+            ]
+            return [future.result() for future in futures]
+
     def add_notes(self, notes: List[Dict[str, Any]], allow_duplicate: bool = False) -> List[Optional[int]]:
         """
         Thêm nhiều ghi chú cùng lúc (Bulk Insert).
         Returns: List các Note ID vừa tạo (theo thứ tự input).
         """
         if allow_duplicate:
+            # Một dict options dùng chung cho mọi note (AnkiConnect chỉ đọc,
+            # không mutate) — khỏi cấp phát N dict giống hệt nhau.
+            options = {"allowDuplicate": True}
             for note in notes:
-                note["options"] = {"allowDuplicate": True}
+                note["options"] = options
         return self._invoke("addNotes", notes=notes)
 
+    def add_notes_with_media(
+        self,
+        notes: List[Dict[str, Any]],
+        media: List[Dict[str, Any]],
+        allow_duplicate: bool = False,
+    ) -> List[Optional[int]]:
+        """
+        Store media + add notes trong MỘT round-trip 'multi'.
+
+        media: list params cho storeMediaFile, vd
+            [{"filename": "a.mp3", "url": "http://..."}, ...]
+        Returns: List Note ID vừa tạo (kết quả của addNotes).
+        """
+        if allow_duplicate:
+            options = {"allowDuplicate": True}
+            for note in notes:
+                note["options"] = options
+        actions = [
+            {"action": "storeMediaFile", "params": m} for m in media
+        ] + [{"action": "addNotes", "params": {"notes": notes}}]
+        results = self.multi(actions)
+        return results[-1]
+
     # =========================================================================
     # MODEL MODIFICATION
     # =========================================================================
@@ -266,10 +571,12 @@ class AnkiConnectAdapter:
         """
         # API requires specific structure: model, templates={cardName: {Front:.., Back:..}}
         self._invoke("updateModelTemplates", model={"name": model_name, "templates": templates})
+        self.invalidate_model_cache(model_name)
 
     def update_model_styling(self, model_name: str, css: str) -> None:
         """Cập nhật CSS cho Model."""
         self._invoke("updateModelStyling", model={"name": model_name, "css": css})
+        self.invalidate_model_cache(model_name)
 
     # =========================================================================
     # NOTE MODIFICATION
@@ -280,7 +587,7 @@ class AnkiConnectAdapter:
         note = {"id": note_id, "fields": fields}
         self._invoke("updateNoteFields", note=note)
 
-    def change_note_model(self, note_id: int, new_model_name: str, fields: Dict[str, str], tags: List[str] = None) -> None:
+    def change_note_model(self, note_id: int, new_model_name: str, fields: Dict[str, str], tags: Optional[List[str]] = None) -> None:
         """
         Chuyển đổi Note sang Model khác.
         Args:
@@ -1,12 +1,93 @@
 # Path: src/core/anki_detector.py
 import sys
 import subprocess
-import re
+import time
 import logging
 from typing import Optional, List
 
 logger = logging.getLogger(__name__)
 
+# Quartz (pyobjc) cho phép hỏi danh sách cửa sổ in-process — mỗi lần poll
+# không phải fork osascript (~100ms). Optional: thiếu thì dùng AppleScript.
+try:
+    from Quartz import (  # type: ignore[import-not-found]
+        CGWindowListCopyWindowInfo,
+        kCGNullWindowID,
+        kCGWindowListOptionOnScreenOnly,
+    )
+    _HAS_QUARTZ = True
+except ImportError:
+    _HAS_QUARTZ = False
+
+# Các cửa sổ hệ thống của Anki không mang tên profile (frozenset: O(1) lookup)
+_SYSTEM_WINDOWS = frozenset({"Anki", "Browse", "Add", "Stats", "Debug Console"})
+
+# PID của anki.exe (win32), cache tới khi process không còn sống
+_anki_pid: Optional[int] = None
+
+
+def _get_anki_pid_win32() -> Optional[int]:
+    """
+    Tìm PID của anki.exe qua CreateToolhelp32Snapshot (không cần psutil).
+    PID được cache; chỉ quét lại snapshot khi process cũ đã thoát.
+    """
+    global _anki_pid
+    import ctypes
+    import ctypes.wintypes as wintypes
+
+    kernel32 = ctypes.windll.kernel32
+
+    if _anki_pid is not None:
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        handle = kernel32.OpenProcess(
+            PROCESS_QUERY_LIMITED_INFORMATION, False, _anki_pid
+        )
+        if handle:
+            exit_code = wintypes.DWORD()
+            alive = (
+                kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+                and exit_code.value == STILL_ACTIVE
+            )
+            kernel32.CloseHandle(handle)
+            if alive:
+                return _anki_pid
+        _anki_pid = None
+
+    TH32CS_SNAPPROCESS = 0x2
+
+    class PROCESSENTRY32W(ctypes.Structure):
+        _fields_ = [
+            ("dwSize", wintypes.DWORD),
+            ("cntUsage", wintypes.DWORD),
+            ("th32ProcessID", wintypes.DWORD),
+            ("th32DefaultHeapID", ctypes.c_void_p),
+            ("th32ModuleID", wintypes.DWORD),
+            ("cntThreads", wintypes.DWORD),
+            ("th32ParentProcessID", wintypes.DWORD),
+            ("pcPriClassBase", ctypes.c_long),
+            ("dwFlags", wintypes.DWORD),
+            ("szExeFile", ctypes.c_wchar * 260),
+        ]
+
+    snapshot = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
+    if snapshot == -1:
+        return None
+    try:
+        entry = PROCESSENTRY32W()
+        entry.dwSize = ctypes.sizeof(PROCESSENTRY32W)
+        if kernel32.Process32FirstW(snapshot, ctypes.byref(entry)):
+            while True:
+                if entry.szExeFile.lower() == "anki.exe":
+                    _anki_pid = int(entry.th32ProcessID)
+                    return _anki_pid
+                if not kernel32.Process32NextW(snapshot, ctypes.byref(entry)):
+                    break
+    finally:
+        kernel32.CloseHandle(snapshot)
+    return None
+
+
 def _run_applescript(script: str) -> str:
     """Helper chạy AppleScript an toàn."""
     try:
@@ -28,6 +109,25 @@ def get_all_anki_window_titles() -> List[str]:
     titles = []
 
     if platform == "darwin":  # macOS
+        # --- CÁCH 0: Quartz in-process, không cần subprocess ---
+        # Trả thẳng list title, khỏi lo delimiter khi ghép/chẻ chuỗi.
+        if _HAS_QUARTZ:
+            try:
+                windows = CGWindowListCopyWindowInfo(
+                    kCGWindowListOptionOnScreenOnly, kCGNullWindowID
+                )
+                titles = [
+                    w["kCGWindowName"]
+                    for w in windows
+                    if w.get("kCGWindowOwnerName") == "Anki"
+                    and w.get("kCGWindowName")
+                ]
+            except Exception as e:
+                logger.debug(f"Quartz window query failed: {e}")
+                titles = []
+            if titles:
+                return [t.strip() for t in titles if t.strip()]
+
         # --- CÁCH 1: Dùng Delimiter ||| (FIXED SCOPE) ---
         # Sửa lỗi -1728: Dùng "AppleScript's text item delimiters" thay vì chỉ "text item delimiters"
         script_strict = '''
@@ -62,9 +162,23 @@ def get_all_anki_window_titles() -> List[str]:
 
     elif platform == "win32":  # Windows
         import ctypes
+        import ctypes.wintypes as wintypes
         user32 = ctypes.windll.user32
-        
+
+        # Lọc theo PID của Anki ngay trong callback: EnumWindows gọi ngược
+        # vào Python cho MỌI cửa sổ desktop, nên loại sớm cửa sổ ẩn/process
+        # khác trước khi đụng tới GetWindowText.
+        anki_pid = _get_anki_pid_win32()
+        if anki_pid is None:
+            return []
+
         def foreach_window(hwnd, lParam):
+            if not user32.IsWindowVisible(hwnd):
+                return True
+            pid = wintypes.DWORD()
+            user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+            if pid.value != anki_pid:
+                return True
             length = user32.GetWindowTextLengthW(hwnd)
             if length > 0:
                 buff = ctypes.create_unicode_buffer(length + 1)
@@ -82,29 +196,58 @@ def get_all_anki_window_titles() -> List[str]:
         
     return clean_titles
 
+# Kết quả detect được memoize trong TTL ngắn: UI poll vài lần/giây nhưng
+# người dùng đổi profile theo thang giây, nên 2s staleness là chấp nhận được.
+_PROFILE_CACHE_TTL = 2.0
+_profile_cache: dict = {"ts": 0.0, "value": None}
+
+
+def invalidate_profile_cache() -> None:
+    """Xoá cache khi caller biết profile vừa đổi (vd. sau loadProfile)."""
+    _profile_cache["ts"] = 0.0
+    _profile_cache["value"] = None
+
+
 def detect_active_profile() -> Optional[str]:
     """
     Phân tích titles để tìm profile.
     """
-    titles = get_all_anki_window_titles()
-    pattern = re.compile(r"^(.*?) - Anki$")
-    
-    for title in titles:
-        if title in ["Anki", "Browse", "Add", "Stats", "Debug Console"]:
-            continue
-        
-        # Ưu tiên match chính xác
-        match = pattern.match(title)
-        if match:
-            return match.group(1).strip()
-
-        # Fallback cho trường hợp chuỗi bị dính
-        if " - Anki" in title:
-            if title.endswith(" - Anki"):
-                parts = title.split(", ")
-                last_part = parts[-1]
-                match_fallback = pattern.match(last_part)
-                if match_fallback:
-                    return match_fallback.group(1).strip()
+    now = time.monotonic()
+    if now - _profile_cache["ts"] < _PROFILE_CACHE_TTL:
+        return _profile_cache["value"]
+
+    result = _detect_active_profile_uncached()
+    _profile_cache["ts"] = now
+    _profile_cache["value"] = result
+    return result
+
+
+def _classify_title(title: str) -> Optional[str]:
+    """
+    Rút tên profile từ một window title, hoặc None nếu không phải.
+
+    Toàn bộ logic phân loại title nằm duy nhất ở đây — mọi nhánh platform
+    đều đi qua cùng một đường, tránh ba bản copy lệch nhau về sau.
+    """
+    if title in _SYSTEM_WINDOWS:
+        return None
+
+    # Một lượt rpartition (scan C-level) thay cho regex + split: sep rỗng
+    # nghĩa là không có " - Anki", tail khác rỗng nghĩa là không ở cuối.
+    # rpartition(", ") thứ hai xử lý luôn trường hợp chuỗi bị dính.
+    head, sep, tail = title.rpartition(" - Anki")
+    if sep and not tail:
+        name = head.rpartition(", ")[2].strip()
+        if name:
+            return name
+
+    return None
+
+
+def _detect_active_profile_uncached() -> Optional[str]:
+    for title in get_all_anki_window_titles():
+        profile = _classify_title(title)
+        if profile is not None:
+            return profile
 
     return None
\ No newline at end of file
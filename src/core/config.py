@@ -1,11 +1,14 @@
 # Path: src/core/config.py
+from dataclasses import dataclass
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Anki Vibe"
     ANKI_CONNECT_URL: str = "http://localhost:8765"
-    
+
     # Paths
     BASE_DIR: Path = Path(__file__).resolve().parent.parent.parent
     DATA_DIR: Path = BASE_DIR / "data"
@@ -15,7 +18,35 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
-        case_sensitive=True
+        case_sensitive=True,
+        frozen=True,
     )
 
-settings = Settings()
\ No newline at end of file
+
+@dataclass(frozen=True, slots=True)
+class _SettingsSnapshot:
+    """
+    Bản chụp immutable của Settings sau khi parse/validate xong.
+
+    Truy cập attribute trên dataclass slots là một lần tp_getattro C-level,
+    không qua tầng indirection của pydantic — đáng kể vì settings.X nằm
+    trên đường nóng (mỗi lần dựng adapter, mỗi lần resolve path).
+    """
+    PROJECT_NAME: str
+    ANKI_CONNECT_URL: str
+    BASE_DIR: Path
+    DATA_DIR: Path
+    ANKI_DATA_DIR: Path
+    CONFIG_DIR: Path
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> _SettingsSnapshot:
+    """
+    Parse .env + validate đúng một lần, trả về snapshot dùng chung.
+    """
+    return _SettingsSnapshot(**Settings().model_dump())
+
+
+# Giữ module-level singleton cho code hiện có (from src.core.config import settings)
+settings = get_settings()
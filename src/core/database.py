@@ -1,20 +1,73 @@
 import sqlite3
 import logging
+import queue
 import threading
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# SQL của các đường nóng ở module level: pysqlite cache statement đã compile
+# theo chính text của câu SQL, nên cùng MỘT string object cho mọi call đảm
+# bảo cache hit và sqlite3_prepare_v2 chỉ chạy lần đầu.
+_SQL_GET_NOTE = "SELECT hash FROM note_states WHERE note_id = ?"
+_SQL_GET_MODEL = "SELECT hash FROM model_states WHERE model_name = ?"
+_SQL_ALL_NOTES = "SELECT note_id, hash FROM note_states"
+_SQL_ALL_MODELS = "SELECT model_name, hash FROM model_states"
+
+
+def _to_blob(value) -> bytes:
+    """Hex string -> raw digest (nửa kích thước); bytes giữ nguyên."""
+    return value if isinstance(value, bytes) else bytes.fromhex(value)
+
+
+def _to_hex(value) -> str:
+    """Đọc ra hex string cho caller; row TEXT cũ (trước migration) pass-through."""
+    return value.hex() if isinstance(value, bytes) else value
+# updated_at: chỉ set lúc INSERT (qua DEFAULT) — không ai đọc cột này nên
+# update không cần rewrite, hàng WAL mỗi upsert nhỏ đi tương ứng.
+_SQL_UPSERT_NOTE = """
+    INSERT INTO note_states (note_id, hash)
+    VALUES (?, ?)
+    ON CONFLICT(note_id) DO UPDATE SET
+        hash=excluded.hash
+"""
+# Compare-and-swap: chỉ ghi khi hash thực sự đổi; RETURNING cho biết có
+# row nào được chạm tới không (cần SQLite >= 3.35, chuẩn với Python 3.10+)
+_SQL_CAS_NOTE = """
+    INSERT INTO note_states (note_id, hash)
+    VALUES (?, ?)
+    ON CONFLICT(note_id) DO UPDATE SET
+        hash=excluded.hash
+        WHERE note_states.hash != excluded.hash
+    RETURNING 1
+"""
+_SQL_UPSERT_MODEL = """
+    INSERT INTO model_states (model_name, hash)
+    VALUES (?, ?)
+    ON CONFLICT(model_name) DO UPDATE SET
+        hash=excluded.hash
+"""
+
 class DatabaseManager:
     """
     Quản lý kết nối và schema của SQLite database cho local state.
-    Thread-safe implementation using RLock and check_same_thread=False.
+
+    WAL cho phép 1 writer + nhiều reader đồng thời, nên chỉ write path
+    serialize qua RLock; read path lấy connection riêng từ một pool nhỏ
+    và không đụng lock — reader không còn xếp hàng sau reader.
     """
     def __init__(self, db_path: Path):
         self.db_path = db_path
         self._connection: Optional[sqlite3.Connection] = None
+        # Writer lock: chỉ bảo vệ connection ghi + batch state + close()
         self._lock = threading.RLock()
+        # Pool connection chỉ-đọc (tạo lazy theo mức concurrency thực tế)
+        self._read_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._read_conns: list = []
+        # Đang trong batch transaction: các update_* không commit lẻ
+        self._in_batch = False
         self._init_db()
 
     def _get_connection(self) -> sqlite3.Connection:
@@ -22,90 +75,248 @@ class DatabaseManager:
             # Tạo thư mục cha nếu chưa tồn tại
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
             # check_same_thread=False: Allow connection sharing across threads
-            self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            # cached_statements=256 (default 128): đủ chỗ cho mọi statement
+            # nóng kể cả khi schema lớn dần, tránh evict/re-prepare
+            self._connection = sqlite3.connect(
+                self.db_path, check_same_thread=False, cached_statements=256
+            )
             self._connection.row_factory = sqlite3.Row
+            self._tune_connection(self._connection)
         return self._connection
 
+    def _tune_connection(self, conn: sqlite3.Connection) -> None:
+        """
+        PRAGMA tuning cho workload sync: nhiều INSERT nhỏ + đọc xen kẽ.
+
+        - WAL + synchronous=NORMAL: bỏ double-fsync mỗi commit, reader
+          không chặn writer (chỉ áp dụng cho DB trên đĩa).
+        - cache_size âm = KB; 64MB đủ giữ trọn working set hash.
+        - mmap 256MB: đọc nóng đi qua page cache thay vì pread.
+        - busy_timeout: chờ thay vì ném SQLITE_BUSY khi có writer khác.
+        - cache_spill=OFF: batch transaction giữ trọn dirty page trong RAM
+          tới lúc commit thay vì spill giữa chừng; soft_heap_limit 64MB
+          làm trần tổng thể tương ứng với cache_size.
+        """
+        cursor = conn.cursor()
+        if str(self.db_path) != ":memory:":
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-65536")
+        cursor.execute("PRAGMA cache_spill=OFF")
+        cursor.execute("PRAGMA soft_heap_limit=67108864")
+        cursor.execute("PRAGMA busy_timeout=5000")
+
+    def _open_read_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, cached_statements=256
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA query_only=ON")
+        with self._lock:
+            self._read_conns.append(conn)
+        return conn
+
+    @contextmanager
+    def _read_connection(self):
+        """
+        Checkout một read connection từ pool (tạo mới nếu pool cạn).
+
+        DB :memory: không chia sẻ được giữa các connection -> đọc trên
+        connection chính dưới lock như cũ.
+        """
+        if str(self.db_path) == ":memory:":
+            with self._lock:
+                yield self._get_connection()
+            return
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            conn = self._open_read_connection()
+        try:
+            yield conn
+        finally:
+            self._read_pool.put(conn)
+
+    # Schema version hiện tại — bump khi đổi DDL
+    SCHEMA_VERSION = 1
+
     def _init_db(self):
         """Khởi tạo bảng nếu chưa có."""
         with self._lock:
             conn = self._get_connection()
             cursor = conn.cursor()
+
+            # user_version đã đúng -> DB init từ trước, khỏi parse DDL và
+            # giành schema lock ở startup của mọi lệnh CLI
+            if cursor.execute("PRAGMA user_version").fetchone()[0] >= self.SCHEMA_VERSION:
+                return
             
             # Bảng lưu trạng thái Notes
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS note_states (
                     note_id INTEGER PRIMARY KEY,
-                    hash TEXT NOT NULL,
+                    hash BLOB NOT NULL,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
 
             # Bảng lưu trạng thái Models
+            # WITHOUT ROWID: PK dạng TEXT mặc định tốn một index riêng trỏ
+            # về rowid (hai lượt B-tree mỗi lookup); clustered theo PK thì
+            # chỉ một. note_states không cần — INTEGER PRIMARY KEY đã chính
+            # là rowid, vốn một B-tree sẵn rồi.
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS model_states (
                     model_name TEXT PRIMARY KEY,
-                    hash TEXT NOT NULL,
+                    hash BLOB NOT NULL,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
+                ) WITHOUT ROWID
             """)
 
+            cursor.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            conn.commit()
+
+    @contextmanager
+    def writer(self):
+        """
+        Transaction ghi tường minh: BEGIN IMMEDIATE giữ write lock ngay từ
+        đầu thay vì để DEFERRED escalate lúc write đầu tiên (dễ dính
+        SQLITE_BUSY dưới contention); commit khi thoát, rollback nếu raise.
+
+        Trong begin_batch() thì chỉ yield connection — transaction bao
+        ngoài sở hữu commit.
+        """
+        with self._lock:
+            conn = self._get_connection()
+            if self._in_batch:
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
             conn.commit()
 
+    def begin_batch(self) -> None:
+        """
+        Mở transaction gom nhiều update_*_hash thành MỘT fsync.
+
+        Autocommit per-row là chi phí lớn nhất của write path (mỗi note một
+        fsync); một transaction cho cả batch đưa O(N) fsync về O(1).
+        BEGIN IMMEDIATE để giữ write lock ngay, tránh upgrade bị SQLITE_BUSY.
+        """
+        with self._lock:
+            if self._in_batch:
+                return
+            self._get_connection().execute("BEGIN IMMEDIATE")
+            self._in_batch = True
+
+    def commit_batch(self) -> None:
+        """Commit batch đang mở. No-op nếu không trong batch."""
+        with self._lock:
+            if not self._in_batch:
+                return
+            self._in_batch = False
+            if self._connection:
+                self._connection.commit()
+
+    def rollback_batch(self) -> None:
+        """Hủy batch đang mở (khi sync fail giữa chừng). No-op nếu không có."""
+        with self._lock:
+            if not self._in_batch:
+                return
+            self._in_batch = False
+            if self._connection:
+                self._connection.rollback()
+
     def close(self):
         with self._lock:
+            self.commit_batch()
+            for conn in self._read_conns:
+                conn.close()
+            self._read_conns.clear()
+            self._read_pool = queue.Queue()
             if self._connection:
+                try:
+                    # optimize: cập nhật planner stats giá rẻ (doc khuyên chạy
+                    # lúc close); checkpoint TRUNCATE để WAL không phình dần
+                    # qua các session
+                    self._connection.execute("PRAGMA optimize")
+                    self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                except sqlite3.Error:
+                    pass
                 self._connection.close()
                 self._connection = None
 
     # --- Note Operations ---
 
     def get_note_hash(self, note_id: int) -> Optional[str]:
-        # Reads are generally thread-safe in SQLite WAL mode or with simple locking
-        # But for safety in Python wrapper, we can lock or trust check_same_thread=False
-        # For consistency, we'll just query directly. Reads don't necessarily need the strict lock
-        # if we are just avoiding write conflicts, but let's lock to be safe against close().
-        with self._lock:
-            if not self._connection: return None
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT hash FROM note_states WHERE note_id = ?", (note_id,))
-            row = cursor.fetchone()
-            return row["hash"] if row else None
+        if not self._connection: return None
+        with self._read_connection() as conn:
+            row = conn.execute(_SQL_GET_NOTE, (note_id,)).fetchone()
+            return _to_hex(row["hash"]) if row else None
 
     def update_note_hash(self, note_id: int, new_hash: str):
-        with self._lock:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO note_states (note_id, hash, updated_at) 
-                VALUES (?, ?, CURRENT_TIMESTAMP)
-                ON CONFLICT(note_id) DO UPDATE SET 
-                    hash=excluded.hash, 
-                    updated_at=CURRENT_TIMESTAMP
-            """, (note_id, new_hash))
-            conn.commit()
+        with self.writer() as conn:
+            conn.execute(_SQL_UPSERT_NOTE, (note_id, _to_blob(new_hash)))
+
+    def load_all_note_hashes(self) -> dict:
+        """
+        Nạp toàn bộ note_states thành dict {note_id: hex_hash}.
+
+        Một lượt scan tuần tự thay cho N lần execute+fetchone khi diff:
+        cả bảng (~vài chục byte/row) nằm gọn trong RAM.
+        """
+        if not self._connection: return {}
+        with self._read_connection() as conn:
+            return {nid: _to_hex(h) for nid, h in conn.execute(_SQL_ALL_NOTES)}
+
+    def load_all_model_hashes(self) -> dict:
+        """Như load_all_note_hashes, cho model_states."""
+        if not self._connection: return {}
+        with self._read_connection() as conn:
+            return {name: _to_hex(h) for name, h in conn.execute(_SQL_ALL_MODELS)}
+
+    def update_note_hashes(self, pairs) -> None:
+        """
+        Bulk upsert (note_id, hash) qua executemany.
+
+        Một lần dispatch Python→C cho cả batch thay vì N lần execute;
+        statement chỉ prepare một lần.
+        """
+        with self.writer() as conn:
+            conn.executemany(
+                _SQL_UPSERT_NOTE, ((nid, _to_blob(h)) for nid, h in pairs)
+            )
+
+    def upsert_note_hash_if_changed(self, note_id: int, new_hash: str) -> bool:
+        """
+        Upsert hash trong MỘT statement, bỏ qua write nếu giá trị không đổi.
+
+        Gộp cặp get+compare+update thành một lần dispatch; với workload pull
+        (đa số hash không đổi) còn tránh luôn việc rewrite row/WAL frame.
+
+        Returns: True nếu row thực sự được insert/update.
+        """
+        with self.writer() as conn:
+            row = conn.execute(
+                _SQL_CAS_NOTE, (note_id, _to_blob(new_hash))
+            ).fetchone()
+            return row is not None
 
     # --- Model Operations ---
 
     def get_model_hash(self, model_name: str) -> Optional[str]:
-        with self._lock:
-            if not self._connection: return None
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT hash FROM model_states WHERE model_name = ?", (model_name,))
-            row = cursor.fetchone()
-            return row["hash"] if row else None
+        if not self._connection: return None
+        with self._read_connection() as conn:
+            row = conn.execute(_SQL_GET_MODEL, (model_name,)).fetchone()
+            return _to_hex(row["hash"]) if row else None
 
     def update_model_hash(self, model_name: str, new_hash: str):
-        with self._lock:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO model_states (model_name, hash, updated_at) 
-                VALUES (?, ?, CURRENT_TIMESTAMP)
-                ON CONFLICT(model_name) DO UPDATE SET 
-                    hash=excluded.hash, 
-                    updated_at=CURRENT_TIMESTAMP
-            """, (model_name, new_hash))
-            conn.commit()
\ No newline at end of file
+        with self.writer() as conn:
+            conn.execute(_SQL_UPSERT_MODEL, (model_name, _to_blob(new_hash)))
\ No newline at end of file
@@ -6,13 +6,29 @@ from logging.handlers import RotatingFileHandler
 from rich.logging import RichHandler
 from src.core.config import settings
 
+# Đã cấu hình xong chưa — tránh dựng lại handler (mỗi RotatingFileHandler
+# là một fd mới) khi setup_logging bị gọi lặp trong cùng process
+_CONFIGURED = False
+_console_handler = None
+
 def setup_logging(log_level: str = "INFO") -> None:
     """
     Thiết lập hệ thống logging cho toàn bộ dự án.
     
     - Console: Sử dụng RichHandler để in màu đẹp mắt.
     - File: Sử dụng RotatingFileHandler để lưu log chi tiết, tự động xoay file.
+
+    Idempotent: gọi lại chỉ chỉnh level, không mở thêm file handler.
     """
+    global _CONFIGURED, _console_handler
+
+    if _CONFIGURED:
+        # Chỉ cần đổi mức log, giữ nguyên handlers đang sống
+        logging.getLogger().setLevel(log_level)
+        if _console_handler is not None:
+            _console_handler.setLevel(log_level)
+        return
+
     # 1. Tạo thư mục logs nếu chưa tồn tại
     log_dir = settings.BASE_DIR / "logs"
     log_dir.mkdir(exist_ok=True)
@@ -58,4 +74,7 @@ def setup_logging(log_level: str = "INFO") -> None:
 
     # Tắt log quá ồn ào từ các thư viện bên thứ 3 (nếu cần)
     logging.getLogger("urllib3").setLevel(logging.WARNING)
-    logging.getLogger("requests").setLevel(logging.WARNING)
\ No newline at end of file
+    logging.getLogger("requests").setLevel(logging.WARNING)
+
+    _console_handler = console_handler
+    _CONFIGURED = True
\ No newline at end of file
@@ -1,7 +1,9 @@
+import os
 import tomllib
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional
-from pydantic import BaseModel, Field, ValidationError
+from pydantic import BaseModel, Field, PrivateAttr, ValidationError
 
 class TargetConfig(BaseModel):
     name: str = Field(..., description="Tên định danh cho target này")
@@ -20,10 +22,17 @@ class ProjectConfig(BaseModel):
     
     # Internal: Lưu đường dẫn file config để resolve path tương đối
     _config_path: Path = Path(".")
+    # Memo {target.name: resolved path} — resolve() là syscall, kết quả
+    # bất biến trong đời config nên chỉ cần tính một lần mỗi target
+    _folder_cache: dict = PrivateAttr(default_factory=dict)
 
     def resolve_folder(self, target: TargetConfig) -> Path:
-        """Trả về đường dẫn tuyệt đối tới folder chứa data của target."""
-        return (self._config_path.parent / target.folder).resolve()
+        """Trả về đường dẫn tuyệt đối tới folder chứa data của target (có cache)."""
+        cached = self._folder_cache.get(target.name)
+        if cached is None:
+            cached = (self._config_path.parent / target.folder).resolve()
+            self._folder_cache[target.name] = cached
+        return cached
 
 def load_project_config(config_path: Path) -> ProjectConfig:
     """Đọc và validate file anki-vibe.toml."""
@@ -40,18 +49,27 @@ def load_project_config(config_path: Path) -> ProjectConfig:
     except ValidationError as e:
         raise ValueError(f"Invalid config format: {e}")
 
+@lru_cache(maxsize=1)
+def _find_project_config_str(start: str) -> Optional[str]:
+    """Walk thuần chuỗi os.path: mỗi bậc thang đúng một stat, không Path churn."""
+    current = os.path.abspath(start)
+    while True:
+        candidate = os.path.join(current, "anki-vibe.toml")
+        if os.path.isfile(candidate):
+            return candidate
+
+        parent = os.path.dirname(current)
+        if parent == current: # Reached root
+            return None
+        current = parent
+
+
 def find_project_config(start_path: Path = Path(".")) -> Optional[Path]:
     """
     Tìm file anki-vibe.toml ngược từ thư mục hiện tại lên root.
+
+    Chạy ở startup của mọi lệnh CLI nên walk bằng os.path trên string
+    (một stat/bậc) và cache kết quả cho cùng start_path.
     """
-    current = start_path.resolve()
-    for _ in range(100): # Limit depth
-        config_file = current / "anki-vibe.toml"
-        if config_file.exists():
-            return config_file
-        
-        parent = current.parent
-        if parent == current: # Reached root
-            break
-        current = parent
-    return None
+    found = _find_project_config_str(os.fspath(start_path))
+    return Path(found) if found is not None else None
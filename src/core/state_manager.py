@@ -17,21 +17,43 @@ class StateManager:
     def get_note_hash(self, note_id: int) -> Optional[str]:
         return self.db.get_note_hash(note_id)
 
+    def snapshot_note_hashes(self) -> dict:
+        """Toàn bộ {note_id: hash} trong một lượt scan — dùng cho diff."""
+        return self.db.load_all_note_hashes()
+
+    def snapshot_model_hashes(self) -> dict:
+        """Toàn bộ {model_name: hash} trong một lượt scan."""
+        return self.db.load_all_model_hashes()
+
     def update_note_hash(self, note_id: int, new_hash: str) -> None:
         self.db.update_note_hash(note_id, new_hash)
 
+    def update_note_hashes(self, pairs) -> None:
+        """Bulk upsert một iterable (note_id, hash) trong một lần dispatch."""
+        self.db.update_note_hashes(pairs)
+
+    def update_note_hash_if_changed(self, note_id: int, new_hash: str) -> bool:
+        """Get+compare+update trong một statement; True nếu hash đổi."""
+        return self.db.upsert_note_hash_if_changed(note_id, new_hash)
+
     def get_model_hash(self, model_name: str) -> Optional[str]:
         return self.db.get_model_hash(model_name)
 
     def update_model_hash(self, model_name: str, new_hash: str) -> None:
         self.db.update_model_hash(model_name, new_hash)
     
+    def begin_batch(self) -> None:
+        """Gom các update hash tiếp theo vào một transaction duy nhất."""
+        self.db.begin_batch()
+
     def save_state(self) -> None:
         """
-        No-op for SQLite implementation as data is persisted immediately.
-        Kept for compatibility with existing service calls.
+        Commit batch transaction đang mở (nếu có).
+
+        Các service vốn đã gọi save_state() ở cuối sync — giờ nó là điểm
+        flush O(1) fsync cho cả batch thay vì no-op.
         """
-        pass
+        self.db.commit_batch()
 
     def close(self) -> None:
         self.db.close()
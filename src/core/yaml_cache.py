@@ -0,0 +1,80 @@
+# Path: src/core/yaml_cache.py
+"""
+Cache kết quả parse YAML theo mtime của file.
+
+Các lần `sync`/`pull` liên tiếp parse lại nguyên notes.yaml dù file không
+đổi — với deck lớn đây là phần CPU nặng nhất của startup. Cache pickle ở
+~/.cache/anki-vibe/yaml.pkl map abspath -> (st_mtime_ns, parsed object);
+mtime khớp thì trả object đã parse, lệch thì parse lại và ghi đè entry.
+"""
+import atexit
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_CACHE_FILE = Path.home() / ".cache" / "anki-vibe" / "yaml.pkl"
+
+# Nạp lazy từ đĩa ở lần dùng đầu; flush một lần lúc thoát process
+_cache: Optional[Dict[str, Tuple[int, Any]]] = None
+_dirty = False
+
+
+def _load_cache() -> Dict[str, Tuple[int, Any]]:
+    global _cache
+    if _cache is None:
+        try:
+            with open(_CACHE_FILE, "rb") as f:
+                _cache = pickle.load(f)
+        except Exception:
+            # Thiếu file / format cũ / pickle hỏng -> bắt đầu rỗng
+            _cache = {}
+    return _cache
+
+
+def _flush() -> None:
+    global _dirty
+    if not _dirty or _cache is None:
+        return
+    try:
+        _CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = _CACHE_FILE.with_suffix(".pkl.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(_cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, _CACHE_FILE)
+        _dirty = False
+    except Exception as e:
+        # Cache chỉ là tối ưu — không được làm hỏng lệnh đang chạy
+        logger.debug(f"Could not persist YAML cache: {e}")
+
+
+atexit.register(_flush)
+
+
+def load_yaml_cached(path: Path, loader: Callable[[Path], Any]) -> Any:
+    """
+    Trả về nội dung YAML đã parse của `path`, dùng cache nếu mtime khớp.
+
+    Args:
+        path: File YAML cần đọc.
+        loader: Callable parse file khi cache miss (nhận Path, trả object).
+    """
+    global _dirty
+    abspath = os.path.abspath(path)
+    mtime_ns = os.stat(abspath).st_mtime_ns
+
+    cache = _load_cache()
+    entry = cache.get(abspath)
+    if entry is not None and entry[0] == mtime_ns:
+        return entry[1]
+
+    parsed = loader(path)
+    cache[abspath] = (mtime_ns, parsed)
+    _dirty = True
+    return parsed
+
+
+__all__ = ["load_yaml_cached"]
@@ -5,13 +5,9 @@ import typer
 from rich.console import Console
 from typing import Optional
 from pathlib import Path
-from src.core.config import settings
-from src.core.anki_detector import detect_active_profile
-from src.core.logging_config import setup_logging
-from src.services.pull_service import PullService
-from src.services.sync_service import SyncService 
-from src.adapters import AnkiConnectAdapter
-from src.core.project_config import find_project_config, load_project_config
+# Mọi import nặng (pydantic settings, services, adapter, detector) nằm
+# trong thân hàm — module scope chỉ còn typer/rich, nên `anki-vibe --help`
+# và tab-completion không phải trả giá cho cả import graph.
 
 # Khởi tạo Logger cho module này
 logger = logging.getLogger(__name__)
@@ -27,12 +23,21 @@ console = Console()
 
 def _initialize_app(verbose: bool) -> None:
     """Common setup for all commands."""
+    from src.core.logging_config import setup_logging
+
     log_level = "DEBUG" if verbose else "INFO"
     setup_logging(log_level)
     logger.debug(f"App initialized with log level: {log_level}")
 
 def _resolve_profile(profile_arg: Optional[str], yes: bool = False) -> str:
     """Helper to resolve profile from argument or auto-detection."""
+    # --profile X --yes (scripted): warning mismatch sẽ bị auto-accept,
+    # khỏi tốn một lượt query window manager chỉ để in nó
+    if profile_arg and yes:
+        return profile_arg
+
+    from src.core.anki_detector import detect_active_profile
+
     target_profile = profile_arg
     
     if not target_profile:
@@ -85,7 +90,11 @@ def pull(
 ) -> None:
     """[PULL] Fetch data from Anki. Auto-detects project config or uses --profile."""
     _initialize_app(verbose)
-    
+    from src.adapters import get_adapter
+    from src.core.config import settings
+    from src.core.project_config import find_project_config, load_project_config
+    from src.services.pull_service import PullService
+
     # 1. Check for Project Config (Project Mode)
     config_path = find_project_config()
     
@@ -97,7 +106,7 @@ def pull(
             
             console.print(f"[bold green]⬇️  Starting Pull for Project: {config.project.name} (Profile: {target_profile})[/bold green]")
             
-            adapter = AnkiConnectAdapter()
+            adapter = get_adapter()
             project_db_path = config_path.parent / ".anki_vibe.db"
             service = PullService(target_profile, adapter, db_path=project_db_path)
             service.pull_project(config)
@@ -127,7 +136,7 @@ def pull(
     console.print(f"[bold green]⬇️  Starting Pull for {target_profile}...[/bold green]")
     
     try:
-        adapter = AnkiConnectAdapter()
+        adapter = get_adapter()
         service = PullService(target_profile, adapter)
         service.pull_all_models()
         
@@ -144,12 +153,15 @@ def info(
 ) -> None:
     """Show current project configuration."""
     _initialize_app(verbose)
+    from src.adapters import get_adapter
+    from src.core.config import settings
+
     
     console.print(f"[bold]Project:[/bold] {settings.PROJECT_NAME}")
     console.print(f"[bold]AnkiConnect:[/bold] {settings.ANKI_CONNECT_URL}")
     
     # Test Connection
-    adapter = AnkiConnectAdapter()
+    adapter = get_adapter()
     try:
         version = adapter.ping()
         console.print(f"✅ [bold green]Connected:[/bold green] {version}")
@@ -173,6 +185,10 @@ def sync(
 ) -> None:
     """[PUSH] Sync data to Anki. Auto-detects project config or uses --profile."""
     _initialize_app(verbose)
+    from src.adapters import get_adapter
+    from src.core.project_config import find_project_config, load_project_config
+    from src.services.sync_service import SyncService
+
     console.print(f"[bold blue]🚀 Starting Anki-Vibe Sync (Push)[/bold blue]")
     
     # 1. Check for Project Config (Project Mode)
@@ -191,7 +207,7 @@ def sync(
                 if not yes and not typer.confirm(f"Push changes for project '{config.project.name}' to profile '{target_profile}'?"):
                     raise typer.Exit()
             
-            adapter = AnkiConnectAdapter()
+            adapter = get_adapter()
             service = SyncService(target_profile, adapter, db_path=project_db_path)
             
             if dry_run:
@@ -219,7 +235,7 @@ def sync(
              raise typer.Exit()
 
     try:
-        adapter = AnkiConnectAdapter()
+        adapter = get_adapter()
         service = SyncService(target_profile, adapter) # Legacy: tự detect db path
         
         if dry_run:
@@ -1,8 +1,8 @@
 # Path: src/models/note.py
 from typing import Dict, List, Optional
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
 
-__all__ = ["AnkiNote"]
+__all__ = ["AnkiNote", "validate_notes"]
 
 class AnkiNote(BaseModel):
     """
@@ -43,4 +43,14 @@ class AnkiNote(BaseModel):
 
     def get_field_content(self, field_name: str) -> str:
         """Helper để lấy nội dung field an toàn."""
-        return self.fields.get(field_name, "")
\ No newline at end of file
+        return self.fields.get(field_name, "")
+
+
+# TypeAdapter build validator cho list[AnkiNote] MỘT lần lúc import; validate
+# cả batch chạy trong pydantic-core (Rust) thay vì N lần dựng model từ Python.
+_NOTES_ADAPTER = TypeAdapter(List[AnkiNote])
+
+
+def validate_notes(raw_notes: list) -> List[AnkiNote]:
+    """Validate một list note đã parse từ YAML thành List[AnkiNote]."""
+    return _NOTES_ADAPTER.validate_python(raw_notes)
\ No newline at end of file
@@ -1,5 +1,8 @@
 # Path: src/services/pull_service.py
+import hashlib
+import io
 import logging
+import os
 import shutil
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Set
@@ -62,25 +65,33 @@ class PullService:
             console=self.console
         ) as progress:
             main_task = progress.add_task("Syncing Targets...", total=len(config.targets))
-            
-            for target in config.targets:
-                progress.update(main_task, description=f"Target: {target.name}")
-                
-                try:
-                    target_dir = config.resolve_folder(target)
-                    target_dir.mkdir(parents=True, exist_ok=True)
-                    
-                    # 1. Save Metadata & Update State
-                    self._save_model_metadata(target.model, target_dir)
-                    
-                    # 2. Save Notes & Update State
-                    self._save_notes_by_query(target.query, target_dir)
-                    
-                except Exception as e:
-                    self.console.print(f"[red]Failed target '{target.name}': {e}[/red]")
-                    logger.error(f"Failed target {target.name}: {e}")
-                
-                progress.advance(main_task)
+
+            # Mỗi target độc lập và I/O-bound (HTTP + ghi file) -> fan-out
+            # qua thread pool như pull_all_models
+            def _pull_target(target):
+                target_dir = config.resolve_folder(target)
+                target_dir.mkdir(parents=True, exist_ok=True)
+
+                # 1. Save Metadata & Update State
+                self._save_model_metadata(target.model, target_dir)
+
+                # 2. Save Notes & Update State
+                self._save_notes_by_query(target.query, target_dir)
+
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                future_to_target = {
+                    executor.submit(_pull_target, target): target
+                    for target in config.targets
+                }
+                for future in as_completed(future_to_target):
+                    target = future_to_target[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        progress.console.print(f"[red]Failed target '{target.name}': {e}[/red]")
+                        logger.error(f"Failed target {target.name}: {e}")
+                    finally:
+                        progress.advance(main_task)
 
     def pull_all_models(self) -> None:
         """Main entry point: Pull toàn bộ Models (Monorepo Legacy)."""
@@ -160,16 +171,22 @@ class PullService:
     def _save_model_metadata(self, model_name: str, model_dir: Path) -> None:
         yaml = self._create_yaml_dumper()
 
-        # Prepare templates mapping for config
-        templates_map_config = {}
+        # Templates + styling trong MỘT round-trip 'multi' (get_models_bundle
+        # cũng seed model cache nên các getter lẻ sau đó khỏi gọi lại)
         try:
-            templates = self.adapter.get_model_templates(model_name)
-            for tpl_name in templates.keys():
-                safe_tpl_name = sanitize_filename(tpl_name).lower()
-                templates_map_config[tpl_name] = safe_tpl_name
+            bundle = self.adapter.get_models_bundle([model_name])[model_name]
+            templates = bundle["templates"]
+            styling = bundle["styling"]
         except Exception as e:
-            logger.warning(f"Could not fetch templates for config mapping: {e}")
+            logger.warning(f"Could not fetch metadata for {model_name}: {e}")
             templates = {}
+            styling = {}
+
+        # Prepare templates mapping for config
+        templates_map_config = {}
+        for tpl_name in templates.keys():
+            safe_tpl_name = sanitize_filename(tpl_name).lower()
+            templates_map_config[tpl_name] = safe_tpl_name
 
         # Config
         config_data = {
@@ -181,15 +198,13 @@ class PullService:
             yaml.dump(config_data, f)
 
         # Styling
-        css_content = ""
-        try:
-            styling = self.adapter.get_model_styling(model_name)
-            css_content = styling.get("css", "")
-            if css_content:
+        css_content = styling.get("css", "")
+        if css_content:
+            try:
                 with open(model_dir / "style.css", "w", encoding="utf-8") as f:
                     f.write(css_content)
-        except Exception as e:
-            logger.warning(f"Could not save CSS for {model_name}: {e}")
+            except Exception as e:
+                logger.warning(f"Could not save CSS for {model_name}: {e}")
 
         # Templates Files
         templates_map = {}
@@ -219,6 +234,22 @@ class PullService:
         query = f'note:"{escaped_model_name}"'
         self._save_notes_by_query(query, model_dir)
 
+    def _compute_notes_signature(self, note_ids: List[int]) -> Optional[str]:
+        """
+        Chữ ký rẻ tiền cho trạng thái upstream của một tập note: blake2b
+        trên các cặp (noteId, mod) đã sort. notesModTime chỉ trả timestamp
+        nên nhẹ hơn notesInfo nhiều lần; AnkiConnect cũ không có action
+        này thì trả None (caller pull đầy đủ như cũ).
+        """
+        try:
+            mods = self.adapter.get_notes_mod_time(note_ids)
+            parts = sorted((m["noteId"], m["mod"]) for m in mods)
+        except Exception as e:
+            logger.debug(f"notesModTime unavailable, full pull: {e}")
+            return None
+        payload = ",".join(f"{nid}:{mod}" for nid, mod in parts)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
     def _save_notes_by_query(self, query: str, target_dir: Path) -> None:
         yaml = self._create_yaml_dumper()
         note_ids = self.adapter.find_notes(query)
@@ -228,6 +259,20 @@ class PullService:
                 (target_dir / "notes.yaml").unlink()
             return
 
+        # Sidecar .notes.hash: chữ ký (id, mod) của lần pull trước. Trùng
+        # và notes.yaml còn đó -> upstream không đổi, bỏ qua notesInfo +
+        # cardsInfo + dump YAML cho cả target.
+        sig_path = target_dir / ".notes.hash"
+        signature = self._compute_notes_signature(note_ids)
+        if (
+            signature is not None
+            and (target_dir / "notes.yaml").exists()
+            and sig_path.exists()
+            and sig_path.read_text(encoding="utf-8").strip() == signature
+        ):
+            logger.info(f"Notes unchanged for query '{query}', skipping pull.")
+            return
+
         notes_info = self.adapter.get_notes_info(note_ids)
         
         all_card_ids = []
@@ -267,7 +312,9 @@ class PullService:
             try:
                 tags = info.get("tags", [])
                 h = compute_note_hash(deck_name, tags, processed_fields)
-                self.state_manager.update_note_hash(note_id, h)
+                # CAS một statement: pull lặp lại đa số hash không đổi,
+                # khỏi rewrite row (và WAL frame) cho các note đó
+                self.state_manager.update_note_hash_if_changed(note_id, h)
             except Exception as e:
                 logger.warning(f"Failed to compute hash for note {note_id}: {e}")
 
@@ -280,5 +327,16 @@ class PullService:
             yaml_notes.append(note_entry)
 
         if yaml_notes:
-            with open(target_dir / "notes.yaml", "w", encoding="utf-8") as f:
-                yaml.dump(yaml_notes, f)
+            # Dumper của ruamel gọi write() cho từng token; gom vào buffer
+            # trong RAM rồi ghi file bằng một syscall duy nhất
+            buf = io.BytesIO()
+            yaml.dump(yaml_notes, buf)
+            # Ghi atomic: dump ra .tmp rồi os.replace — crash giữa chừng
+            # không để lại notes.yaml cụt
+            notes_path = target_dir / "notes.yaml"
+            tmp_path = notes_path.with_suffix(".yaml.tmp")
+            tmp_path.write_bytes(buf.getvalue())
+            os.replace(tmp_path, notes_path)
+
+            if signature is not None:
+                sig_path.write_text(signature, encoding="utf-8")
@@ -1,14 +1,26 @@
 # Path: src/services/sync_service.py
+import io
 import logging
+import os
 from pathlib import Path
 from typing import List, Dict, Any, Tuple, Optional
 
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn
+import yaml as pyyaml
 from ruamel.yaml import YAML
 
+# config.yaml chỉ đọc (không ghi lại) -> loader C của PyYAML là đủ và
+# nhanh hơn hẳn ruamel round-trip; ruamel giữ riêng cho notes.yaml vì
+# file đó được ghi ngược lại và cần bảo toàn format.
+try:
+    _CONFIG_LOADER = pyyaml.CSafeLoader
+except AttributeError:  # libyaml không có sẵn
+    _CONFIG_LOADER = pyyaml.SafeLoader
+
 from src.core.config import settings
 from src.core.state_manager import StateManager
+from src.core.yaml_cache import load_yaml_cached
 from src.core.project_config import ProjectConfig
 from src.adapters import AnkiConnectAdapter
 from src.utils.hashing import compute_note_hash, compute_model_hash
@@ -45,6 +57,8 @@ class SyncService:
             console=self.console
         ) as progress:
             main_task = progress.add_task("Syncing Targets...", total=len(config.targets))
+            # Một transaction cho cả lượt push; save_state() cuối hàm commit
+            self.state_manager.begin_batch()
             
             for target in config.targets:
                 target_dir = config.resolve_folder(target)
@@ -78,6 +92,7 @@ class SyncService:
             console=self.console
         ) as progress:
             main_task = progress.add_task("Syncing...", total=len(model_dirs))
+            self.state_manager.begin_batch()
 
             for model_dir in model_dirs:
                 model_name = self._get_model_name_from_config(model_dir)
@@ -107,7 +122,7 @@ class SyncService:
             return ""
         try:
             with open(config_path, "r", encoding="utf-8") as f:
-                data = self.yaml.load(f)
+                data = pyyaml.load(f, Loader=_CONFIG_LOADER)
                 return data.get("anki_model_name", "")
         except Exception:
             return ""
@@ -128,7 +143,7 @@ class SyncService:
             templates_mapping = {}
             if config_path.exists():
                 with open(config_path, "r", encoding="utf-8") as f:
-                    config_data = self.yaml.load(f)
+                    config_data = pyyaml.load(f, Loader=_CONFIG_LOADER)
                     templates_mapping = config_data.get("templates", {})
 
             if templates_mapping:
@@ -180,8 +195,12 @@ class SyncService:
             return
 
         try:
-            with open(notes_path, "r", encoding="utf-8") as f:
-                notes_data = self.yaml.load(f) or []
+            # Parse cache theo mtime: chạy sync lặp lại trên notes.yaml
+            # không đổi thì khỏi reparse (phần CPU nặng nhất với deck lớn)
+            notes_data = load_yaml_cached(
+                notes_path,
+                lambda p: self.yaml.load(p.read_text(encoding="utf-8")),
+            ) or []
         except Exception as e:
             logger.error(f"Failed to load notes.yaml for {model_name}: {e}")
             return
@@ -192,6 +211,9 @@ class SyncService:
         batch_actions = [] # List actions cho lệnh multi
         dirty_note_hashes = {} # Map id -> new_hash để update state sau khi thành công
 
+        # Snapshot hash một lần: N lookup dict thay vì N round-trip SQLite
+        stored_hashes = self.state_manager.snapshot_note_hashes()
+
         # 1. Phân loại (Filter)
         for idx, note in enumerate(notes_data):
             note_id = note.get("id")
@@ -216,8 +238,7 @@ class SyncService:
                 continue
 
             # Case B: Note Cũ (Có ID) -> Check Hash
-            stored_hash = self.state_manager.get_note_hash(note_id)
-            if current_hash != stored_hash:
+            if current_hash != stored_hashes.get(note_id):
                 # Có thay đổi -> Thêm vào batch update
                 # 1. Update Fields
                 batch_actions.append(
@@ -231,10 +252,16 @@ class SyncService:
                 # Lưu hash mới để update state sau
                 dirty_note_hashes[note_id] = current_hash
 
+        created_note_hashes = {} # Hash của note vừa tạo (add thành công)
+
         # 2. Thực thi CREATE (Bulk Add)
         if to_create:
             logger.info(f"Creating {len(to_create)} new notes for {model_name}...")
             try:
+                # Mỗi deck duy nhất một lần; ensure_deck còn cache các deck
+                # đã biết nên target sau cùng deck là 0 round-trip
+                for deck_name in {n["deckName"] for n in to_create}:
+                    self.adapter.ensure_deck(deck_name)
                 # Allow duplicates to ensure YAML source of truth is respected
                 new_ids = self.adapter.add_notes(to_create, allow_duplicate=True)
                 
@@ -244,10 +271,10 @@ class SyncService:
                         original_idx = to_create_indices[i]
                         notes_data[original_idx]["id"] = new_id
                         
-                        # Update Hash cho note mới
+                        # Update Hash cho note mới (gom lại, upsert một lần)
                         note_obj = to_create[i]
                         h = compute_note_hash(note_obj["deckName"], note_obj["tags"], note_obj["fields"])
-                        self.state_manager.update_note_hash(new_id, h)
+                        created_note_hashes[new_id] = h
             except Exception as e:
                 logger.error(f"Failed to add notes: {e}")
 
@@ -261,14 +288,23 @@ class SyncService:
                     chunk = batch_actions[i:i+chunk_size]
                     self.adapter.multi(chunk)
                 
-                # Nếu không lỗi, update state hash
-                for nid, h in dirty_note_hashes.items():
-                    self.state_manager.update_note_hash(nid, h)
-                    
             except Exception as e:
                 logger.error(f"Failed to batch update notes: {e}")
+                # Update fail -> đừng ghi nhận hash mới của các note dirty
+                dirty_note_hashes = {}
+
+        # Một executemany cho mọi hash thay đổi (note mới + note update)
+        pending_hashes = {**created_note_hashes, **dirty_note_hashes}
+        if pending_hashes:
+            self.state_manager.update_note_hashes(pending_hashes.items())
 
         # 4. Lưu lại ID mới vào file YAML (Nếu có create)
         if to_create:
-            with open(notes_path, "w", encoding="utf-8") as f:
-                self.yaml.dump(notes_data, f)
+            # Ghi một lần từ buffer nhớ thay vì hàng nghìn write() nhỏ
+            buf = io.BytesIO()
+            self.yaml.dump(notes_data, buf)
+            # Ghi atomic: notes.yaml là source of truth, không được để cụt
+            # nếu crash giữa lúc ghi lại ID mới
+            tmp_path = notes_path.with_suffix(".yaml.tmp")
+            tmp_path.write_bytes(buf.getvalue())
+            os.replace(tmp_path, notes_path)
@@ -0,0 +1,109 @@
+# Path: src/utils/syllabify.py
+"""
+Tách âm tiết Indic script bằng DFA single-pass (không dùng regex engine).
+
+Grammar (dạng chính quy trên các lớp ký tự Unicode rời nhau):
+    Sinhala:    S = C(HZ?C)*H?M*  |  VM*
+    Devanagari: S = CN?(HZ?CN?)*H?M*  |  VM*
+
+Với: C = phụ âm, V = nguyên âm độc lập, H = virama (hal kirīma / halant),
+Z = ZWJ/ZWNJ, N = nukta, M = dấu nguyên âm phụ thuộc + anusvara/visarga.
+
+Mỗi codepoint chỉ cần một lần lookup bảng lớp + branch, thay vì chạy qua
+NFA simulation của module `regex` cho từng từ.
+"""
+from typing import Dict, List, Tuple
+
+__all__ = ["syllabify_sinhala", "syllabify_devanagari"]
+
+# Mã lớp ký tự. _O (other) phải là 0 vì bảng mặc định là 0.
+_O, _C, _V, _H, _Z, _M, _N = range(7)
+
+# Bảng phủ tới hết vùng ZWJ/ZWNJ (0x200C-0x200D)
+_TABLE_SIZE = 0x2010
+
+
+def _make_table(spans: Dict[int, List[Tuple[int, int]]]) -> bytes:
+    table = bytearray(_TABLE_SIZE)
+    for cls, ranges in spans.items():
+        for lo, hi in ranges:
+            for cp in range(lo, hi + 1):
+                table[cp] = cls
+    return bytes(table)
+
+
+# Sinhala (U+0D80-U+0DFF)
+_SINHALA_TABLE = _make_table({
+    _V: [(0x0D85, 0x0D96)],                     # Nguyên âm độc lập
+    _C: [(0x0D9A, 0x0DC6)],                     # Phụ âm
+    _H: [(0x0DCA, 0x0DCA)],                     # Al-lakuna (virama)
+    _M: [(0x0D82, 0x0D83),                      # Anusvara / Visarga
+         (0x0DCF, 0x0DDF), (0x0DF2, 0x0DF3)],   # Dấu nguyên âm phụ thuộc
+    _Z: [(0x200C, 0x200D)],                     # ZWNJ / ZWJ
+})
+
+# Devanagari (U+0900-U+097F)
+_DEVANAGARI_TABLE = _make_table({
+    _V: [(0x0904, 0x0914), (0x0960, 0x0961), (0x0972, 0x0977)],
+    _C: [(0x0915, 0x0939), (0x0958, 0x095F), (0x0978, 0x097F)],
+    _H: [(0x094D, 0x094D)],                     # Virama (halant)
+    _N: [(0x093C, 0x093C)],                     # Nukta
+    _M: [(0x0900, 0x0903),                      # Candrabindu / Anusvara / Visarga
+         (0x093E, 0x094C), (0x0962, 0x0963)],   # Dấu nguyên âm phụ thuộc
+    _Z: [(0x200C, 0x200D)],
+})
+
+
+def _scan(text: str, table: bytes) -> List[str]:
+    """DFA scanner: một lần duyệt, emit slice tại mỗi ranh giới âm tiết."""
+    out: List[str] = []
+    i, n = 0, len(text)
+    while i < n:
+        cp = ord(text[i])
+        cls = table[cp] if cp < _TABLE_SIZE else _O
+
+        if cls == _C:
+            start = i
+            i += 1
+            # Nukta ngay sau phụ âm (Devanagari)
+            if i < n and ord(text[i]) < _TABLE_SIZE and table[ord(text[i])] == _N:
+                i += 1
+            # Cụm phụ âm: (H Z? C N?)*, virama cuối từ đóng âm tiết
+            while i < n and ord(text[i]) < _TABLE_SIZE and table[ord(text[i])] == _H:
+                j = i + 1
+                if j < n and ord(text[j]) < _TABLE_SIZE and table[ord(text[j])] == _Z:
+                    j += 1
+                if j < n and ord(text[j]) < _TABLE_SIZE and table[ord(text[j])] == _C:
+                    i = j + 1
+                    if i < n and ord(text[i]) < _TABLE_SIZE and table[ord(text[i])] == _N:
+                        i += 1
+                else:
+                    # Virama không theo sau bởi phụ âm -> pure consonant
+                    i += 1
+                    break
+            # Dấu nguyên âm / anusvara / visarga
+            while i < n and ord(text[i]) < _TABLE_SIZE and table[ord(text[i])] == _M:
+                i += 1
+            out.append(text[start:i])
+
+        elif cls == _V:
+            start = i
+            i += 1
+            while i < n and ord(text[i]) < _TABLE_SIZE and table[ord(text[i])] == _M:
+                i += 1
+            out.append(text[start:i])
+
+        else:
+            # Ký tự ngoài script (space, ASCII, ZWJ mồ côi...) -> bỏ qua
+            i += 1
+    return out
+
+
+def syllabify_sinhala(text: str) -> List[str]:
+    """Tách âm tiết Sinhala theo grammar C(HZ?C)*H?M* | VM*."""
+    return _scan(text, _SINHALA_TABLE)
+
+
+def syllabify_devanagari(text: str) -> List[str]:
+    """Tách âm tiết Devanagari theo grammar CN?(HZ?CN?)*H?M* | VM*."""
+    return _scan(text, _DEVANAGARI_TABLE)
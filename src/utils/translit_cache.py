@@ -0,0 +1,74 @@
+# Path: src/utils/translit_cache.py
+"""
+Cache bền vững cho aksharamukha transliterate.process.
+
+Key là (src, dst, word); kết quả được lưu vào SQLite (.cache/translit.db)
+nên các lần chạy lại script chỉ tốn một SELECT (~µs) thay vì chạy lại rule
+engine (~ms) cho mỗi từ. lru_cache phía trên loại luôn cả SELECT cho các
+từ lặp trong cùng một lần chạy.
+"""
+import atexit
+import sqlite3
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from aksharamukha import transliterate
+
+__all__ = ["translit"]
+
+_CACHE_PATH = Path(".cache") / "translit.db"
+
+# Commit theo lô để tránh fsync cho từng INSERT
+_COMMIT_EVERY = 256
+
+_conn: Optional[sqlite3.Connection] = None
+_pending = 0
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(str(_CACHE_PATH))
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        # Nhiều worker process có thể cùng ghi cache -> chờ thay vì lỗi locked
+        _conn.execute("PRAGMA busy_timeout=5000")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS translit ("
+            "src TEXT NOT NULL, dst TEXT NOT NULL, word TEXT NOT NULL, "
+            "result TEXT NOT NULL, "
+            "PRIMARY KEY (src, dst, word))"
+        )
+        atexit.register(_flush)
+    return _conn
+
+
+def _flush() -> None:
+    if _conn is not None:
+        _conn.commit()
+
+
+@lru_cache(maxsize=None)
+def translit(src: str, dst: str, word: str) -> str:
+    """Transliterate word, ưu tiên cache (memory -> sqlite -> aksharamukha)."""
+    global _pending
+    conn = _get_conn()
+    row = conn.execute(
+        "SELECT result FROM translit WHERE src = ? AND dst = ? AND word = ?",
+        (src, dst, word),
+    ).fetchone()
+    if row is not None:
+        return str(row[0])
+
+    result = str(transliterate.process(src, dst, word))
+    conn.execute(
+        "INSERT OR REPLACE INTO translit VALUES (?, ?, ?, ?)",
+        (src, dst, word, result),
+    )
+    _pending += 1
+    if _pending >= _COMMIT_EVERY:
+        conn.commit()
+        _pending = 0
+    return result
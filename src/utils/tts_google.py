@@ -2,11 +2,15 @@ import requests
 import base64
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
 
 class GoogleTTS:
     def __init__(self, api_key):
         self.api_key = api_key
         self.url = f"https://texttospeech.googleapis.com/v1/text:synthesize?key={api_key}"
+        # Session dùng chung: giữ kết nối TLS, an toàn khi gọi từ nhiều thread
+        self.session = requests.Session()
 
     def synthesize(self, text: str, output_file: str) -> bool:
         """
@@ -27,7 +31,7 @@ class GoogleTTS:
         }
         
         try:
-            res = requests.post(self.url, json=payload, timeout=10)
+            res = self.session.post(self.url, json=payload, timeout=10)
             if res.status_code == 200:
                 audio_content = res.json().get("audioContent")
                 if audio_content:
@@ -40,3 +44,18 @@ class GoogleTTS:
             print(f"TTS Network Error: {e}")
             
         return False
+
+    def synthesize_batch(
+        self, items: List[Tuple[str, str]], max_workers: int = 8
+    ) -> List[bool]:
+        """
+        Synthesize nhiều đoạn text song song.
+        Per-request overhead chiếm phần lớn thời gian với text ngắn (một ký
+        tự, vài từ), nên bắn đồng thời qua connection pool của session thay
+        vì tuần tự. items: list (text, output_file).
+        Returns: list cờ thành công theo đúng thứ tự input.
+        """
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda it: self.synthesize(*it), items))